@@ -1,9 +1,14 @@
+import json
 import os
 import pickle
 from typing import Optional
 
 commits_number_limit: int = 100
 
+# results of the A/B mode are stored next to regular ones with these prefixes
+ab_ratio_result_prefix: str = 'ab_ratio:'
+ab_difference_result_prefix: str = 'ab_difference:'
+
 
 class Runner:
     def __init__(self, name: str, description: str, docker_id: str):
@@ -31,10 +36,18 @@ class Config:
     default_website_output_dir: str = os.getcwd()
     default_database_dir: str = os.getcwd()
     default_skip_faulty_commits: bool = False
+    default_repositories_dir: Optional[str] = None
+    default_compiler_time_report: bool = False
+    default_ab_baseline: Optional[str] = None
+    default_persistent_containers: bool = False
+    default_container_recycle_tasks: int = 20
+    default_archive_outputs: bool = True
 
     def __init__(self, max_threads: int, compilation_runs: int, compilations_pause: float, benchmark_runs: int,
                  sleep_time: int, commit_bnchmrk_pages: bool, website_output_dir: str, database_dir: str,
-                 skip_faulty_commits: bool):
+                 skip_faulty_commits: bool, repositories_dir: Optional[str], compiler_time_report: bool,
+                 ab_baseline: Optional[str], persistent_containers: bool, container_recycle_tasks: int,
+                 archive_outputs: bool):
         self.ID: Optional[int] = None
         self.max_threads: int = max_threads
         self.compilation_runs: int = compilation_runs
@@ -48,6 +61,27 @@ class Config:
             self.website_output_dir: Optional[str] = website_output_dir
         self.database_dir: str = database_dir
         self.skip_faulty_commits: bool = skip_faulty_commits
+        self.repositories_dir: Optional[str] = repositories_dir
+        self.compiler_time_report: bool = compiler_time_report
+        self.ab_baseline: Optional[str] = ab_baseline
+        self.persistent_containers: bool = persistent_containers
+        self.container_recycle_tasks: int = container_recycle_tasks
+        self.archive_outputs: bool = archive_outputs
 
     def as_bytes(self) -> bytes:
         return pickle.dumps(self)
+
+    def as_measurement_bytes(self) -> bytes:
+        # only options that affect measured values, so results can be reused when others are changed
+        values = {
+            'max_threads': self.max_threads,
+            'compilation_runs': self.compilation_runs,
+            'compilations_pause': self.compilations_pause,
+            'benchmark_runs': self.benchmark_runs,
+            'compiler_time_report': self.compiler_time_report,
+        }
+        if self.ab_baseline is not None:
+            values['ab_baseline'] = self.ab_baseline  # added only if used, so keys of other results don't change
+        if self.persistent_containers:
+            values['persistent_containers'] = True  # warm page cache and reused toolchain may shift timings
+        return json.dumps(values, sort_keys=True).encode('utf-8')
@@ -0,0 +1,138 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from classes import Runner, Config
+from database import Database
+from results_cache import ResultsCache
+
+
+class Coordinator:
+    default_host: str = 'localhost'
+    default_port: int = 8080
+    default_lease_time: float = 600.0
+
+    def __init__(self, db: Database, results_cache: ResultsCache, runners: List[Runner], bnchmrk_commit_hash: str,
+                 config: Config, lease_time: float):
+        # the database object holds a single connection, so each access to it should be done under this lock
+        self.lock = threading.Lock()
+        self.db: Database = db
+        self.results_cache: ResultsCache = results_cache
+        self.runners: List[Runner] = runners
+        self.bnchmrk_commit_hash: str = bnchmrk_commit_hash
+        self.ab_baseline: Optional[str] = config.ab_baseline
+        # results are saved to the database named by these options, so workers have to measure with the same ones
+        self.measurement_config: Dict = json.loads(config.as_measurement_bytes())
+        self.lease_time: float = lease_time
+        self.server: Optional[HTTPServer] = None
+
+    def _get_runner_(self, name: str) -> Optional[Runner]:
+        for runner in self.runners:
+            if runner.name == name:
+                return runner
+        return None
+
+    def _check_measurement_config_(self, request: Dict) -> Optional[Tuple[int, Dict]]:
+        if request.get('measurement_config') != self.measurement_config:
+            return 409, {'error': 'coordinator uses measurement options {}, but worker has {}'.format(
+                self.measurement_config, request.get('measurement_config'))}
+        return None
+
+    def lease(self, request: Dict) -> Tuple[int, Optional[Dict]]:
+        if request['bnchmrk_commit'] != self.bnchmrk_commit_hash:
+            return 409, {'error': 'coordinator uses fmt_bnchmrk commit {}, but worker has {}'.format(
+                self.bnchmrk_commit_hash, request['bnchmrk_commit'])}
+        if request.get('ab_baseline') != self.ab_baseline:
+            return 409, {'error': 'coordinator uses A/B baseline {}, but worker has {}'.format(
+                self.ab_baseline, request.get('ab_baseline'))}
+        mismatch = self._check_measurement_config_(request)
+        if mismatch is not None:
+            return mismatch
+        runners = [runner for runner in self.runners if runner.name in request['runners']]
+        with self.lock, self.db:
+            task = self.db.lease_task(request['worker'], runners, self.lease_time)
+        if task is None:
+            return 204, None
+        commit, runner = task
+        return 200, {
+            'commit_ID': commit.ID,
+            'commit_hash': commit.hash,
+            'commit_timepoint': commit.timepoint,
+            'runner_name': runner.name,
+            'lease_time': self.lease_time,
+        }
+
+    def heartbeat(self, request: Dict) -> Tuple[int, Optional[Dict]]:
+        runner = self._get_runner_(request['runner_name'])
+        if runner is None:
+            return 404, {'error': 'unknown runner "{}"'.format(request['runner_name'])}
+        with self.lock, self.db:
+            is_renewed = self.db.renew_lease(request['worker'], request['commit_ID'], runner, self.lease_time)
+        if not is_renewed:
+            return 409, {'error': 'lease is lost'}
+        return 200, {'lease_time': self.lease_time}
+
+    def upload(self, request: Dict) -> Tuple[int, Optional[Dict]]:
+        runner = self._get_runner_(request['runner_name'])
+        if runner is None:
+            return 404, {'error': 'unknown runner "{}"'.format(request['runner_name'])}
+        runner_docker_ID = str(request['runner_docker_ID'])
+        # options are checked on lease too, but the coordinator may have been restarted with other ones since then
+        mismatch = self._check_measurement_config_(request)
+        if mismatch is not None:
+            return mismatch
+        results = request['results']
+        if results is not None:
+            results = [(str(name), float(value)) for name, value in results]
+        with self.lock, self.db:
+            commit = self.db.complete_task(request['worker'], request['commit_ID'], runner, results)
+        if commit is None:
+            return 409, {'error': 'task is leased to another worker'}
+        # workers on other hosts build their own images, so results are cached under the image that produced them
+        worker_runner = Runner(runner.name, runner.description, runner_docker_ID)
+        worker_runner.ID = runner.ID
+        self.results_cache.store(commit, worker_runner, results)
+        return 200, {}
+
+    def start(self, host: str, port: int):
+        handlers: Dict[str, Callable[[Dict], Tuple[int, Optional[Dict]]]] = {
+            '/lease': self.lease,
+            '/heartbeat': self.heartbeat,
+            '/results': self.upload,
+        }
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                handler = handlers.get(self.path)
+                if handler is None:
+                    self.send_error(404)
+                    return
+                try:
+                    content_length = int(self.headers.get('Content-Length', 0))
+                    request = json.loads(self.rfile.read(content_length))
+                    status, response = handler(request)
+                except (ValueError, KeyError, TypeError) as error:
+                    status, response = 400, {'error': str(error)}
+                self.send_response(status)
+                if response is None:
+                    self.end_headers()
+                    return
+                body = json.dumps(response).encode('utf-8')
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # requests logging would break StepPrinter output
+
+        self.server = HTTPServer((host, port), RequestHandler)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -4,11 +4,108 @@ import platform
 import re
 import sqlite3
 import subprocess
-from typing import List, Optional, Tuple
+import time
+from typing import Dict, List, Optional, Tuple
 
 from classes import Runner, Commit, Config
 
 
+def create_tables(cursor: sqlite3.Cursor):
+    cursor.execute(
+        '''
+        CREATE TABLE meta
+        (
+            key TEXT NOT NULL,
+            value TEXT NOT NULL
+        )
+        ''')
+    cursor.execute(
+        '''
+        CREATE TABLE commits
+        (
+            ID INTEGER NOT NULL PRIMARY KEY,
+            hash TEXT NOT NULL,
+            timepoint INTEGER NOT NULL
+        )
+        ''')
+    cursor.execute(
+        '''
+        CREATE TABLE runners
+        (
+            ID INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT NOT NULL
+        )
+        ''')
+    cursor.execute(
+        '''
+        CREATE TABLE results
+        (
+            commit_ID INTEGER NOT NULL,
+            runner_ID INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            time REAL NOT NULL,
+            FOREIGN KEY (commit_ID) REFERENCES commits (ID),
+            FOREIGN KEY (runner_ID) REFERENCES runners (ID)
+        )
+        ''')
+    create_missing_tables(cursor)
+
+
+# tables added after the initial schema, they are created in databases from previous versions as well
+optional_tables: Dict[str, str] = {
+    'tasks':
+        '''
+        CREATE TABLE tasks
+        (
+            commit_ID INTEGER NOT NULL,
+            runner_ID INTEGER NOT NULL,
+            commit_hash TEXT NOT NULL,
+            commit_timepoint INTEGER NOT NULL,
+            worker TEXT,
+            lease_expiration REAL,
+            PRIMARY KEY (commit_ID, runner_ID),
+            FOREIGN KEY (runner_ID) REFERENCES runners (ID)
+        )
+        ''',
+    'symbols':
+        '''
+        CREATE TABLE symbols
+        (
+            ID INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+        ''',
+    'symbol_sizes':
+        '''
+        CREATE TABLE symbol_sizes
+        (
+            commit_ID INTEGER NOT NULL,
+            runner_ID INTEGER NOT NULL,
+            library TEXT NOT NULL,
+            symbol_ID INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            FOREIGN KEY (commit_ID) REFERENCES commits (ID),
+            FOREIGN KEY (runner_ID) REFERENCES runners (ID),
+            FOREIGN KEY (symbol_ID) REFERENCES symbols (ID)
+        )
+        ''',
+}
+
+
+def create_missing_tables(cursor: sqlite3.Cursor):
+    existing_tables = {row[0] for row in cursor.execute('SELECT name FROM sqlite_master WHERE type = "table";')}
+    for table_name, table_schema in optional_tables.items():
+        if table_name not in existing_tables:
+            cursor.execute(table_schema)
+
+
+# symbol sizes are passed along with other results, but they are stored separately, so they don't bloat results table
+symbol_size_result_name_format: str = '{library}_library_symbol_size:{symbol}'
+symbol_size_result_name_pattern: re.Pattern = re.compile(
+    r'^(?P<library>static|shared)_library_symbol_size:(?P<symbol>.+)$')
+
+
 class Database:
     def __init__(self,
                  config: Config,
@@ -20,44 +117,7 @@ class Database:
         if not os.path.exists(self.db_file_path):
             self.connection = sqlite3.connect(self.db_file_path)
             cursor = self.connection.cursor()
-            cursor.execute(
-                '''
-                CREATE TABLE meta
-                (
-                    key TEXT NOT NULL,
-                    value TEXT NOT NULL
-                )
-                ''')
-            cursor.execute(
-                '''
-                CREATE TABLE commits
-                (
-                    ID INTEGER NOT NULL PRIMARY KEY,
-                    hash TEXT NOT NULL,
-                    timepoint INTEGER NOT NULL
-                )
-                ''')
-            cursor.execute(
-                '''
-                CREATE TABLE runners
-                (
-                    ID INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    description TEXT NOT NULL
-                )
-                ''')
-            cursor.execute(
-                '''
-                CREATE TABLE results
-                (
-                    commit_ID INTEGER NOT NULL,
-                    runner_ID INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    time REAL NOT NULL,
-                    FOREIGN KEY (commit_ID) REFERENCES commits (ID),
-                    FOREIGN KEY (runner_ID) REFERENCES runners (ID)
-                )
-                ''')
+            create_tables(cursor)
 
             lsb_release: str = subprocess.run(['lsb_release', '-d'], stdout=subprocess.PIPE).stdout.decode('utf-8')
             lsb_release_match = re.search("Description:\s*(.+)", lsb_release)
@@ -97,9 +157,18 @@ class Database:
                     bnchmrk_commit_hash=bnchmrk_commit_hash,
                     gnrtr_commit_hash=gnrtr_commit_hash,
                 ))
+            if config.ab_baseline is not None:
+                cursor.execute('INSERT INTO meta (key, value) VALUES (?, ?);', ('A/B baseline', config.ab_baseline))
             self.connection.commit()
             self.connection.close()
 
+    @classmethod
+    def from_file(cls, db_file_path: str) -> 'Database':
+        # already produced database, e.g. merged from several hosts, is used as is
+        db = cls.__new__(cls)
+        db.db_file_path = db_file_path
+        return db
+
     def __del__(self):
         pass
 
@@ -187,7 +256,7 @@ class Database:
         cursor = self.connection.cursor()
         cursor.execute(
             '''
-            INSERT INTO commits (ID, hash, timepoint)
+            INSERT OR IGNORE INTO commits (ID, hash, timepoint)
             VALUES ({ID}, '{hash}', {timepoint});
             '''.format(
                 ID=commit.ID,
@@ -195,6 +264,14 @@ class Database:
                 timepoint=commit.timepoint
             ))
         if results is not None:
+            symbol_sizes: List[Tuple[str, str, float]] = list()
+            other_results: List[Tuple[str, float]] = list()
+            for result in results:
+                match = symbol_size_result_name_pattern.match(result[0])
+                if match:
+                    symbol_sizes.append((match.group('library'), match.group('symbol'), result[1]))
+                else:
+                    other_results.append(result)
             cursor.executemany(
                 '''
                 INSERT INTO results (commit_ID, runner_ID, name, time)
@@ -202,9 +279,31 @@ class Database:
                 '''.format(
                     commit_ID=commit.ID,
                     runner_ID=runner.ID
-                ), results)
+                ), other_results)
+            self._save_symbol_sizes_(commit, runner, symbol_sizes)
         self.connection.commit()
 
+    def remove_results(self, commit: Commit):
+        cursor = self.connection.cursor()
+        cursor.execute('DELETE FROM results WHERE commit_ID = ?;', (commit.ID,))
+        cursor.execute('DELETE FROM symbol_sizes WHERE commit_ID = ?;', (commit.ID,))
+        cursor.execute('DELETE FROM commits WHERE ID = ?;', (commit.ID,))
+        self.connection.commit()
+
+    def _save_symbol_sizes_(self, commit: Commit, runner: Runner, symbol_sizes: List[Tuple[str, str, float]]):
+        cursor = self.connection.cursor()
+        cursor.executemany('INSERT OR IGNORE INTO symbols (name) VALUES (?);',
+                           [(symbol,) for _, symbol, _ in symbol_sizes])
+        symbol_identifiers: Dict[str, int] = {name: ID for ID, name in cursor.execute('SELECT ID, name FROM symbols;')}
+        cursor.executemany(
+            '''
+            INSERT INTO symbol_sizes (commit_ID, runner_ID, library, symbol_ID, size)
+            VALUES ({commit_ID}, {runner_ID}, ?, ?, ?);
+            '''.format(
+                commit_ID=commit.ID,
+                runner_ID=runner.ID
+            ), [(library, symbol_identifiers[symbol], int(size)) for library, symbol, size in symbol_sizes])
+
     def calculate_hash(self) -> str:
         hash_md5 = hashlib.md5()
         with open(self.db_file_path, "rb") as f:
@@ -234,6 +333,50 @@ class Database:
             ))
         return list(exec_result)
 
+    def get_symbol_sizes_for(self, runner_id: int):
+        cursor = self.connection.cursor()
+        exec_result = cursor.execute(
+            '''
+            SELECT
+                commits.hash AS commit_hash,
+                commits.ID AS commit_ID,
+                commits.timepoint AS commit_timepoint,
+                symbol_sizes.library AS library,
+                symbols.name AS symbol_name,
+                symbol_sizes.size AS symbol_size
+            FROM
+                symbol_sizes
+            INNER JOIN commits ON commits.ID = symbol_sizes.commit_ID
+            INNER JOIN symbols ON symbols.ID = symbol_sizes.symbol_ID
+            WHERE
+                symbol_sizes.runner_ID = '{runner_id}'
+            ORDER BY
+                commit_ID DESC;
+            '''.format(
+                runner_id=runner_id
+            ))
+        return list(exec_result)
+
+    def get_commits_timepoints(self) -> List[Tuple[str, int]]:
+        cursor = self.connection.cursor()
+        exec_result = cursor.execute(
+            '''
+            SELECT DISTINCT
+                hash,
+                timepoint
+            FROM
+                commits;
+            ''')
+        return list(exec_result)
+
+    def get_runners(self) -> List[Runner]:
+        runners: List[Runner] = list()
+        for ID, name, description in self.connection.execute('SELECT ID, name, description FROM runners;'):
+            runner = Runner(name, description, '')  # image of a runner is unknown for a database from another host
+            runner.ID = ID
+            runners.append(runner)
+        return runners
+
     def get_meta_values(self) -> List[Tuple[str, str]]:
         cursor = self.connection.cursor()
         exec_result = cursor.execute(
@@ -244,3 +387,106 @@ class Database:
                 meta;
             ''')
         return list(exec_result)
+
+    def prepare_tables(self):
+        create_missing_tables(self.connection.cursor())
+        self.connection.commit()
+
+    def enqueue_tasks(self, commits: List[Commit], runners: List[Runner]):
+        cursor = self.connection.cursor()
+        # commits that are out of the window aren't shown anymore, tasks that are being executed are left to finish
+        cursor.execute(
+            '''
+            DELETE FROM tasks
+            WHERE
+                commit_hash NOT IN ({commit_hashes}) AND
+                (worker IS NULL OR lease_expiration < ?);
+            '''.format(
+                commit_hashes=', '.join('?' for _ in commits)
+            ), [commit.hash for commit in commits] + [time.time()])
+        cursor.executemany(
+            '''
+            INSERT OR IGNORE INTO tasks (commit_ID, runner_ID, commit_hash, commit_timepoint)
+            VALUES (?, ?, ?, ?);
+            ''', [(commit.ID, runner.ID, commit.hash, commit.timepoint)
+                  for commit in commits if not commit.is_processed
+                  for runner in runners])
+        self.connection.commit()
+
+    def get_pending_tasks_amount(self) -> int:
+        cursor = self.connection.cursor()
+        exec_result = cursor.execute('SELECT COUNT(*) FROM tasks;')
+        return list(exec_result)[0][0]
+
+    def lease_task(self, worker: str, runners: List[Runner], lease_time: float) -> Optional[Tuple[Commit, Runner]]:
+        runners_by_ID = {runner.ID: runner for runner in runners}
+        if len(runners_by_ID) == 0:
+            return None
+        now: float = time.time()
+        cursor = self.connection.cursor()
+        exec_result = cursor.execute(
+            '''
+            SELECT
+                commit_ID,
+                runner_ID,
+                commit_hash,
+                commit_timepoint
+            FROM
+                tasks
+            WHERE
+                (worker IS NULL OR lease_expiration < ?) AND
+                runner_ID IN ({runner_IDs})
+            ORDER BY
+                commit_ID DESC
+            LIMIT 1;
+            '''.format(
+                runner_IDs=', '.join(str(runner_ID) for runner_ID in runners_by_ID)
+            ), (now,))
+        rows = list(exec_result)
+        if len(rows) == 0:
+            return None
+        commit_ID, runner_ID, commit_hash, commit_timepoint = rows[0]
+        cursor.execute(
+            '''
+            UPDATE tasks
+            SET worker = ?, lease_expiration = ?
+            WHERE commit_ID = ? AND runner_ID = ?;
+            ''', (worker, now + lease_time, commit_ID, runner_ID))
+        self.connection.commit()
+
+        commit = Commit(commit_hash, commit_timepoint)
+        commit.ID = commit_ID
+        return commit, runners_by_ID[runner_ID]
+
+    def renew_lease(self, worker: str, commit_ID: int, runner: Runner, lease_time: float) -> bool:
+        cursor = self.connection.cursor()
+        cursor.execute(
+            '''
+            UPDATE tasks
+            SET lease_expiration = ?
+            WHERE commit_ID = ? AND runner_ID = ? AND worker = ? AND lease_expiration >= ?;
+            ''', (time.time() + lease_time, commit_ID, runner.ID, worker, time.time()))
+        self.connection.commit()
+        return cursor.rowcount > 0
+
+    def complete_task(self, worker: str, commit_ID: int, runner: Runner,
+                      results: Optional[List[Tuple[str, float]]]) -> Optional[Commit]:
+        cursor = self.connection.cursor()
+        exec_result = cursor.execute(
+            '''
+            SELECT
+                commit_hash,
+                commit_timepoint
+            FROM
+                tasks
+            WHERE
+                commit_ID = ? AND runner_ID = ? AND worker = ?;
+            ''', (commit_ID, runner.ID, worker))
+        rows = list(exec_result)
+        if len(rows) == 0:
+            return None
+        cursor.execute('DELETE FROM tasks WHERE commit_ID = ? AND runner_ID = ?;', (commit_ID, runner.ID))
+        commit = Commit(rows[0][0], rows[0][1])
+        commit.ID = commit_ID
+        self.save_results(commit, runner, results)
+        return commit
@@ -0,0 +1,141 @@
+import os
+import sqlite3
+from typing import Dict, List, Set, Tuple
+
+from database import create_tables, create_missing_tables
+
+
+class MergeError(Exception):
+    pass
+
+
+def _merge_meta_(cursor: sqlite3.Cursor, output_name: str, sources: List[Tuple[str, sqlite3.Connection]]):
+    meta: Dict[str, str] = dict(cursor.execute('SELECT key, value FROM meta;'))
+    # values of each key from every database, including the output one, labelled with the database path
+    values: Dict[str, Dict[str, str]] = dict()
+    for key, value in meta.items():
+        values.setdefault(key, dict())[output_name] = value
+    for source_name, source in sources:
+        for key, value in source.execute('SELECT key, value FROM meta;'):
+            values.setdefault(key, dict())[source_name] = value
+
+    for key, source_values in values.items():
+        # a key that is already split by sources in the output database stays split
+        is_labelled: bool = any(existing_key.startswith('{} ('.format(key)) for existing_key in meta)
+        if len(set(source_values.values())) == 1 and not is_labelled:
+            if key not in meta:
+                cursor.execute('INSERT INTO meta (key, value) VALUES (?, ?);',
+                               (key, next(iter(source_values.values()))))
+            continue
+        if key == 'fmt_bnchmrk commit':
+            raise MergeError('databases were produced with different fmt_bnchmrk commits: {}'.format(
+                ', '.join('"{}" - {}'.format(name, value) for name, value in source_values.items())))
+        # different hosts have different platforms, so keep them all, each one is marked with its source
+        cursor.execute('DELETE FROM meta WHERE key = ?;', (key,))
+        for source_name, value in source_values.items():
+            source_key = '{} ({})'.format(key, source_name)
+            cursor.execute('DELETE FROM meta WHERE key = ?;', (source_key,))
+            cursor.execute('INSERT INTO meta (key, value) VALUES (?, ?);', (source_key, value))
+
+
+def _merge_runners_(cursor: sqlite3.Cursor, source: sqlite3.Connection) -> Dict[int, int]:
+    runners_map: Dict[int, int] = dict()
+    for source_ID, name, description in list(source.execute('SELECT ID, name, description FROM runners;')):
+        exec_result = list(cursor.execute('SELECT ID FROM runners WHERE name = ? AND description = ?;',
+                                          (name, description)))
+        if len(exec_result) > 0:
+            runners_map[source_ID] = exec_result[0][0]
+        else:
+            cursor.execute('INSERT INTO runners (name, description) VALUES (?, ?);', (name, description))
+            runners_map[source_ID] = cursor.lastrowid
+    return runners_map
+
+
+def _merge_commits_(cursor: sqlite3.Cursor, source: sqlite3.Connection, source_name: str) -> Dict[int, int]:
+    commits_map: Dict[int, int] = dict()
+    hashes: Dict[str, int] = dict()
+    identifiers: Dict[int, str] = dict()
+    for ID, commit_hash in cursor.execute('SELECT ID, hash FROM commits;'):
+        hashes.setdefault(commit_hash, ID)
+        identifiers[ID] = commit_hash
+
+    for source_ID, commit_hash, timepoint in list(source.execute('SELECT ID, hash, timepoint FROM commits;')):
+        if commit_hash in hashes:
+            commits_map[source_ID] = hashes[commit_hash]
+            continue
+        # commit IDs are positions in {fmt} history, so they have to be the same on every host
+        if source_ID in identifiers:
+            raise MergeError('commit {} from "{}" has ID {}, which is already taken by commit {}'.format(
+                commit_hash, source_name, source_ID, identifiers[source_ID]))
+        cursor.execute('INSERT INTO commits (ID, hash, timepoint) VALUES (?, ?, ?);',
+                       (source_ID, commit_hash, timepoint))
+        hashes[commit_hash] = source_ID
+        identifiers[source_ID] = commit_hash
+        commits_map[source_ID] = source_ID
+    return commits_map
+
+
+def _merge_results_(cursor: sqlite3.Cursor, source: sqlite3.Connection,
+                    runners_map: Dict[int, int], commits_map: Dict[int, int]) -> Set[Tuple[int, int]]:
+    existing_tasks: Set[Tuple[int, int]] = set(cursor.execute('SELECT DISTINCT commit_ID, runner_ID FROM results;'))
+    merged_tasks: Set[Tuple[int, int]] = set()
+    new_results: List[Tuple[int, int, str, float]] = list()
+    for commit_ID, runner_ID, name, time in source.execute('SELECT commit_ID, runner_ID, name, time FROM results;'):
+        task = (commits_map[commit_ID], runners_map[runner_ID])
+        # the first database that has results for a task wins, so merging is idempotent
+        if task in existing_tasks:
+            continue
+        merged_tasks.add(task)
+        new_results.append((task[0], task[1], name, time))
+    cursor.executemany('INSERT INTO results (commit_ID, runner_ID, name, time) VALUES (?, ?, ?, ?);', new_results)
+    return merged_tasks
+
+
+def _merge_symbol_sizes_(cursor: sqlite3.Cursor, source: sqlite3.Connection,
+                         runners_map: Dict[int, int], commits_map: Dict[int, int], merged_tasks: Set[Tuple[int, int]]):
+    source_tables = {row[0] for row in source.execute('SELECT name FROM sqlite_master WHERE type = "table";')}
+    if 'symbol_sizes' not in source_tables:
+        return  # database from the previous version
+
+    source_symbols: Dict[int, str] = dict(source.execute('SELECT ID, name FROM symbols;'))
+    cursor.executemany('INSERT OR IGNORE INTO symbols (name) VALUES (?);',
+                       [(name,) for name in source_symbols.values()])
+    symbols: Dict[str, int] = {name: ID for ID, name in cursor.execute('SELECT ID, name FROM symbols;')}
+
+    new_symbol_sizes: List[Tuple[int, int, str, int, int]] = list()
+    for commit_ID, runner_ID, library, symbol_ID, size in \
+            source.execute('SELECT commit_ID, runner_ID, library, symbol_ID, size FROM symbol_sizes;'):
+        task = (commits_map[commit_ID], runners_map[runner_ID])
+        if task not in merged_tasks:
+            continue
+        new_symbol_sizes.append((task[0], task[1], library, symbols[source_symbols[symbol_ID]], size))
+    cursor.executemany('INSERT INTO symbol_sizes (commit_ID, runner_ID, library, symbol_ID, size) '
+                       'VALUES (?, ?, ?, ?, ?);', new_symbol_sizes)
+
+
+def merge_databases(output_file_path: str, input_file_paths: List[str]):
+    is_new_database: bool = not os.path.exists(output_file_path)
+    connection = sqlite3.connect(output_file_path)
+    try:
+        cursor = connection.cursor()
+        if is_new_database:
+            create_tables(cursor)
+        else:
+            create_missing_tables(cursor)
+        # paths are used as labels, since databases from different hosts usually have the same file name
+        sources: List[Tuple[str, sqlite3.Connection]] = list()
+        try:
+            for input_file_path in input_file_paths:
+                sources.append((input_file_path, sqlite3.connect(input_file_path)))
+            _merge_meta_(cursor, output_file_path, sources)
+            for source_name, source in sources:
+                runners_map = _merge_runners_(cursor, source)
+                commits_map = _merge_commits_(cursor, source, source_name)
+                merged_tasks = _merge_results_(cursor, source, runners_map, commits_map)
+                _merge_symbol_sizes_(cursor, source, runners_map, commits_map, merged_tasks)
+        finally:
+            for _, source in sources:
+                source.close()
+        connection.commit()
+    finally:
+        connection.close()
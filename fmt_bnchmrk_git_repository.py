@@ -2,23 +2,38 @@ import glob
 import os
 import shutil
 import tempfile
+from typing import Optional
 
 import git
 
 
 class FmtBnchmrkRepo:
     pages_branch_name: str = 'gh-pages'
+    mirror_directory_name: str = 'fmt_bnchmrk'
 
-    def __init__(self):
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.repo = git.Repo.clone_from('git@github.com:alexezeder/fmt_bnchmrk.git', self.temp_dir.name)
+    def __init__(self, repositories_dir: Optional[str] = None):
+        if repositories_dir is None:
+            self.temp_dir = tempfile.TemporaryDirectory()
+            self.directory: str = self.temp_dir.name
+        else:
+            self.directory: str = os.path.join(repositories_dir, FmtBnchmrkRepo.mirror_directory_name)
+
+        if os.path.isdir(os.path.join(self.directory, '.git')):
+            # persistent mirror from the previous start, it should be on the latest commit as a fresh clone would be
+            self.repo = git.Repo(self.directory)
+            self.repo.remotes['origin'].fetch()
+            self.repo.head.reference = self.repo.commit('origin/HEAD')
+            self.repo.head.reset(index=True, working_tree=True)
+        else:
+            self.repo = git.Repo.clone_from('git@github.com:alexezeder/fmt_bnchmrk.git', self.directory)
         origin_refs = self.repo.remotes['origin'].refs
         if FmtBnchmrkRepo.pages_branch_name in origin_refs:
-            self.repo.remotes['origin'].fetch(refspec='{}:{}'.format(FmtBnchmrkRepo.pages_branch_name,
-                                                                     FmtBnchmrkRepo.pages_branch_name))
+            # pages are force-pushed orphan commits, so the local branch of a mirror is never fast-forwarded
+            self.repo.remotes['origin'].fetch(refspec='+{}:{}'.format(FmtBnchmrkRepo.pages_branch_name,
+                                                                      FmtBnchmrkRepo.pages_branch_name))
 
     def get_directory(self) -> str:
-        return self.temp_dir.name
+        return self.directory
 
     def get_commit_hash(self) -> str:
         return self.repo.commit('HEAD').hexsha
@@ -35,8 +50,8 @@ class FmtBnchmrkRepo:
         self.repo.head.reset(index=True, working_tree=True)
 
         for filename in glob.glob(os.path.join(pages_directory, '*.*')):
-            shutil.copy(filename, self.temp_dir.name)
-            self.repo.index.add([os.path.join(self.temp_dir.name, os.path.basename(filename))])
+            shutil.copy(filename, self.directory)
+            self.repo.index.add([os.path.join(self.directory, os.path.basename(filename))])
 
         actor = git.Actor('Page Committer Bot', 'kill@all.humans')
         self.repo.index.commit('update pages', author=actor, committer=actor)
@@ -1,5 +1,7 @@
+import os
+import tarfile
 import tempfile
-from typing import List
+from typing import List, Optional
 
 import git
 
@@ -7,16 +9,29 @@ import classes
 
 
 class FmtRepo:
-    def __init__(self):
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.repo = git.Repo.clone_from('https://github.com/fmtlib/fmt.git', self.temp_dir.name)
+    mirror_directory_name: str = 'fmt'
 
-        self.repo.head.reference = self.repo.commit('HEAD')
+    def __init__(self, repositories_dir: Optional[str] = None):
+        if repositories_dir is None:
+            self.temp_dir = tempfile.TemporaryDirectory()
+            self.directory: str = self.temp_dir.name
+        else:
+            self.directory: str = os.path.join(repositories_dir, FmtRepo.mirror_directory_name)
+
+        if os.path.isdir(os.path.join(self.directory, '.git')):
+            # persistent mirror from the previous start, only new commits need to be fetched
+            self.repo = git.Repo(self.directory)
+            self.repo.head.reference = self.repo.commit('HEAD')
+            self.update()
+        else:
+            self.repo = git.Repo.clone_from('https://github.com/fmtlib/fmt.git', self.directory)
+
+        self.repo.head.reference = self.repo.commit('master')
         self.repo.head.reset(index=True, working_tree=True)
         assert self.repo.head.is_detached
 
     def get_directory(self) -> str:
-        return self.temp_dir.name
+        return self.directory
 
     def update(self):
         origin = self.repo.remotes.origin
@@ -42,6 +57,17 @@ class FmtRepo:
         self.repo.head.reference = self.repo.commit(commit)
         self.repo.head.reset(index=True, working_tree=True)
 
+    def get_commit_hash(self, revision: str) -> str:
+        return self.repo.commit(revision).hexsha
+
     def get_commit_message(self, commit_hash: str) -> str:
         commit = self.repo.commit(commit_hash)
         return commit.message
+
+    def export_commit(self, commit: str, directory: str):
+        # separate copy of the source tree, so it doesn't interfere with the current commit
+        with tempfile.TemporaryFile() as archive_file:
+            self.repo.archive(archive_file, treeish=commit)
+            archive_file.seek(0)
+            with tarfile.open(fileobj=archive_file) as archive:
+                archive.extractall(directory)
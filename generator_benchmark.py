@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from css_html_js_minify import html_minify
+from jsmin import jsmin
+
+from classes import Runner, Commit, Config
+from database import Database
+from site_generator import SiteGenerator, BenchmarkGroupPage
+from task_executor import get_suites_results
+from tools import StepPrinter
+
+
+class SyntheticFmtRepo:
+    def get_commit_message(self, commit_hash: str) -> str:
+        return 'Synthetic commit {}\n\nWith some description that is not shown anywhere.'.format(commit_hash)
+
+
+class GeneratorBenchmark:
+    def __init__(self, commits_amount: int, benchmarks_amount: int, runs_amount: int, suites_amount: int):
+        self.commits_amount: int = commits_amount
+        self.benchmarks_amount: int = benchmarks_amount
+        self.runs_amount: int = runs_amount
+        self.suites_amount: int = suites_amount
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.stages: List[Dict] = list()
+
+        self.benchmark_names: List[str] = ['format_to_args_synthetic_{}'.format(index)
+                                           for index in range(benchmarks_amount)]
+        self.commits: List[Commit] = list()
+        for index in range(commits_amount):
+            commit = Commit('{:040x}'.format(random.getrandbits(160)), 1600000000 + index * 3600)
+            commit.ID = index
+            self.commits.append(commit)
+
+    def measure(self, name: str, function: Callable, reset: Optional[Callable] = None):
+        with StepPrinter('Measuring "{}"'.format(name)):
+            # tracemalloc slows down every allocation, so duration and peak memory are measured in separate passes
+            start_time = time.perf_counter()
+            result = function()
+            duration = time.perf_counter() - start_time
+            if reset is not None:
+                reset()
+            tracemalloc.start()
+            function()
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        self.stages.append({'name': name, 'seconds': duration, 'peak_memory_bytes': peak_memory})
+        return result
+
+    def prepare_suites_outputs(self) -> str:
+        outputs_dir = os.path.join(self.temp_dir.name, 'output')
+        os.makedirs(outputs_dir)
+        suite_size = (self.benchmarks_amount + self.suites_amount - 1) // self.suites_amount
+        for suite_index in range(self.suites_amount):
+            names = self.benchmark_names[suite_index * suite_size:(suite_index + 1) * suite_size]
+            for run_index in range(self.runs_amount):
+                file_path = os.path.join(outputs_dir, 'suite_{}_results_{}.json'.format(suite_index, run_index + 1))
+                with open(file_path, 'w') as results_json:
+                    json.dump({'benchmarks': [{'name': name,
+                                               'real_time': random.uniform(10.0, 1000.0),
+                                               'cpu_time': random.uniform(10.0, 1000.0),
+                                               'time_unit': 'ns'} for name in names]}, results_json)
+        return outputs_dir
+
+    def parse_suites_outputs(self, outputs_dir: str) -> List[List[Tuple[str, float]]]:
+        # the real generator parses outputs of each commit separately
+        return [get_suites_results(outputs_dir) for _ in self.commits]
+
+    def prepare_database(self) -> Tuple[Database, Runner]:
+        config = Config(Config.default_max_threads, Config.default_compilation_runs,
+                        Config.default_compilations_pause, Config.default_benchmark_runs, Config.default_sleep_time,
+                        False, self.temp_dir.name, self.temp_dir.name, Config.default_skip_faulty_commits, None,
+                        Config.default_compiler_time_report, Config.default_ab_baseline,
+                        Config.default_persistent_containers, Config.default_container_recycle_tasks,
+                        Config.default_archive_outputs)
+        db = Database(config, 'synthetic', 'synthetic', 'synthetic')
+        runner = Runner('synthetic', 'Synthetic runner', 'synthetic')
+        with db:
+            db.synchronize_runners([runner])
+        return db, runner
+
+    def save_results(self, db: Database, runner: Runner, results: List[List[Tuple[str, float]]]):
+        with db:
+            for commit, commit_results in zip(self.commits, results):
+                db.save_results(commit, runner, commit_results)
+
+    def remove_results(self, db: Database):
+        with db:
+            for commit in self.commits:
+                db.remove_results(commit)
+
+    def run(self) -> Dict:
+        with StepPrinter('Preparing synthetic benchmark suites outputs'):
+            outputs_dir = self.prepare_suites_outputs()
+        results = self.measure('get_suites_results', lambda: self.parse_suites_outputs(outputs_dir))
+        db, runner = self.prepare_database()
+        self.measure('Database.save_results', lambda: self.save_results(db, runner, results),
+                     lambda: self.remove_results(db))
+        with db:
+            sorted_results = self.measure('Database.get_results_for', lambda: db.get_results_for(runner.ID))
+        sorted_results.reverse()
+
+        site_generator = SiteGenerator()
+        page = BenchmarkGroupPage(name='Synthetic', description='Synthetic benchmarks',
+                                  patterns=[re.compile(r'^format_to_args_(?P<name>.*)$')])
+        pages_dir = os.path.join(self.temp_dir.name, 'pages')
+        os.makedirs(pages_dir)
+        fmt_repo = SyntheticFmtRepo()
+        filtered_results = self.measure('Page.filter_results', lambda: page.filter_results(sorted_results))
+        with db:
+            self.measure('Page.generate', lambda: page.generate(filtered_results, [page], fmt_repo, db, pages_dir))
+
+        html = page.template_html.render(pages=[page], script_prefix=page.slug, current_page_name=page.name)
+        with open(os.path.join(pages_dir, 'script-{}.js'.format(page.slug)), 'r') as js_file:
+            js = js_file.read()
+        self.measure('html_minify', lambda: html_minify(html))
+        self.measure('jsmin', lambda: jsmin(js))
+
+        with db:
+            self.measure('SiteGenerator.generate',
+                         lambda: site_generator.generate(db, fmt_repo, [runner], pages_dir))
+
+        return {
+            'parameters': {
+                'commits': self.commits_amount,
+                'benchmarks': self.benchmarks_amount,
+                'runs': self.runs_amount,
+                'suites': self.suites_amount,
+            },
+            'platform': {
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+            },
+            'stages': self.stages,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of fmt_bnchmrk_gnrtr own data path on synthetic data',
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--commits', dest='commits', type=int, default=100,
+                        help='amount of synthetic commits\n(default: 100)')
+    parser.add_argument('--benchmarks', dest='benchmarks', type=int, default=200,
+                        help='amount of synthetic benchmarks in each commit\n(default: 200)')
+    parser.add_argument('--runs', dest='runs', type=int, default=2,
+                        help='amount of runs of each benchmark suite\n(default: 2)')
+    parser.add_argument('--suites', dest='suites', type=int, default=4,
+                        help='amount of benchmark suites benchmarks are split into\n(default: 4)')
+    parser.add_argument('--seed', dest='seed', type=int, default=0,
+                        help='seed for synthetic data generation\n(default: 0)')
+    parser.add_argument('--output', dest='output', type=str, default='generator_benchmark.json',
+                        help='file to write results to\n(default: "generator_benchmark.json")')
+
+    args = parser.parse_args()
+    random.seed(args.seed)
+    benchmark = GeneratorBenchmark(args.commits, args.benchmarks, args.runs, args.suites)
+    report = benchmark.run()
+    with open(args.output, 'w') as output_json:
+        json.dump(report, output_json, indent=2)
+    for stage in report['stages']:
+        print('{:<28} {:>10.3f}s {:>12} bytes'.format(stage['name'], stage['seconds'], stage['peak_memory_bytes']))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,134 +1,30 @@
 #!/usr/bin/env python3
 import argparse
-import glob
 import hashlib
-import json
-import os
-import re
 import tempfile
 import time
-from typing import List, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
 
 import git
-from docker import DockerClient, from_env, errors
+from docker import from_env
 
 from classes import Runner, Commit, Config
+from coordinator import Coordinator
 from database import Database
+from database_merger import merge_databases
 from fmt_bnchmrk_git_repository import FmtBnchmrkRepo
 from fmt_git_repository import FmtRepo
+from outputs_archive import OutputsArchive
+from results_cache import ResultsCache
 from site_generator import SiteGenerator
+from task_executor import execute_task, parse_archived_outputs, prepare_baseline, prepare_runner_containers, \
+    prepare_runners, resolve_baseline
 from tools import StepPrinter
+from worker import get_default_worker_name, run_worker
 
 
-def get_image_name_for_runner(runner_name: str) -> str:
-    return 'fmt_bnchmrk:{}'.format(runner_name)
-
-
-def get_stat_results(temp_dir_name: str) -> List[Tuple[str, float]]:
-    results = list()
-    compilation_time_total: float = 0.0
-    files = glob.glob(os.path.join(temp_dir_name, 'compilation_time_*.txt'))
-    for file_path in files:
-        with open(file_path, 'r') as result_txt:
-            lines = [line.rstrip() for line in result_txt]
-            for line in lines:
-                match = re.match(r"^real\t(\d+)m([\d.]+)s", line)
-                if match:
-                    minutes = float(match.group(1))
-                    seconds = float(match.group(2))
-                    compilation_time_total += seconds + minutes * 60
-    compilation_time = compilation_time_total / len(files)
-    results.append(('compilation_time', compilation_time))
-
-    with open(os.path.join(temp_dir_name, 'static_library_size.txt'), 'r') as result_txt:
-        library_size = int(result_txt.read())
-        results.append(('static_library_size', library_size))
-
-    with open(os.path.join(temp_dir_name, 'shared_library_size.txt'), 'r') as result_txt:
-        library_size = int(result_txt.read())
-        results.append(('shared_library_size', library_size))
-
-    return results
-
-
-def get_suites_results(temp_dir_name: str) -> List[Tuple[str, float]]:
-    files: List[str] = glob.glob(os.path.join(temp_dir_name, '*.json'))
-
-    class Result:
-        def __init__(self, name: str, amount: int, time: float):
-            self.name: str = name
-            self.amount: int = amount
-            self.time: float = time
-
-    results: List[Result] = list()
-    for file_path in files:
-        with open(file_path, 'r') as results_json:
-            parsed = json.load(results_json)
-            for benchmark in parsed['benchmarks']:
-                result_name = str(benchmark['name'])
-                result_time = float(benchmark['real_time'])
-                filtered_results: List[Result] = [result for result in results if result.name == result_name]
-                if len(filtered_results) == 0:
-                    results.append(Result(result_name, 1, result_time))
-                else:
-                    filtered_results[0].time += result_time
-                    filtered_results[0].amount += 1
-
-    return [(result.name, result.time / result.amount) for result in results]
-
-
-def execute_task(docker_client: DockerClient, fmt_repo: FmtRepo, fmt_bnchmrk_repo: FmtBnchmrkRepo, commit: Commit,
-                 runner: Runner, config: Config) -> Optional[List[Tuple[str, float]]]:
-    fmt_repo.set_current_commit(commit.hash)
-
-    temp_dir = tempfile.TemporaryDirectory()
-    temp_dir_name = temp_dir.name
-    volumes = {
-        fmt_repo.get_directory(): {'bind': '/fmt', 'mode': 'ro'},
-        fmt_bnchmrk_repo.get_directory(): {'bind': '/benchmarks', 'mode': 'ro'},
-        temp_dir_name: {'bind': '/output', 'mode': 'rw'}
-    }
-    environment = {
-        "RUNNER_MAX_THREADS": config.max_threads,
-        "RUNNER_COMPILATION_RUNS": config.compilation_runs,
-        "RUNNER_COMPILATION_PAUSE": config.compilations_pause,
-        "RUNNER_BENCHMARK_RUNS": config.benchmark_runs,
-    }
-
-    try:
-        docker_client.containers.run(get_image_name_for_runner(runner.name),
-                                     detach=False, volumes=volumes, environment=environment, remove=True)
-    except errors.ContainerError:
-        if config.skip_faulty_commits:
-            return None
-        else:
-            raise
-
-    results = get_stat_results(temp_dir_name)
-    results.extend(get_suites_results(temp_dir_name))
-    return results
-
-
-def run(config: Config):
-    with StepPrinter('Preparing fmt_bnchmrk repository'):
-        fmt_bnchmrk_repo = FmtBnchmrkRepo()
-    with StepPrinter('Preparing {fmt} repository'):
-        fmt_repo = FmtRepo()
-    with StepPrinter('Preparing site generator'):
-        site_generator = SiteGenerator()
-    with StepPrinter('Initializing Docker client'):
-        docker_client = from_env()
-    with StepPrinter('Preparing runners'):
-        runner_directories = glob.glob('runners/*')
-        runners: List[Runner] = list()
-        for runner_directory in runner_directories:
-            tag_name = os.path.basename(runner_directory)
-            image = docker_client.images.build(path=runner_directory,
-                                               tag=get_image_name_for_runner(tag_name),
-                                               rm=True)[0]
-            description = image.labels['description']
-            runners.append(Runner(tag_name, description, image.id))
-
+def prepare_database(config: Config, fmt_bnchmrk_repo: FmtBnchmrkRepo, runners: List[Runner]) -> Database:
     with StepPrinter('Preparing components info'):
         bnchmrk_commit_hash: str = fmt_bnchmrk_repo.get_commit_hash()
         gnrtr_commit_hash: str = git.Repo('.').commit('HEAD').hexsha
@@ -143,42 +39,192 @@ def run(config: Config):
     with StepPrinter('Preparing database'):
         db = Database(config, final_components_hash, bnchmrk_commit_hash, gnrtr_commit_hash)
     with db, StepPrinter('Synchronizing runners info with database'):
+        db.prepare_tables()
         db.synchronize_runners(runners)
+    return db
+
+
+def generate_website(config: Config, db: Database, site_generator: SiteGenerator, fmt_repo: FmtRepo,
+                     fmt_bnchmrk_repo: FmtBnchmrkRepo, runners: List[Runner]):
+    if config.website_output_dir is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        website_dir = temp_dir.name
+    else:
+        website_dir = config.website_output_dir
+    with db, StepPrinter('Generating website'):
+        site_generator.generate(db, fmt_repo, runners, website_dir)
+        if config.commit_bnchmrk_pages:
+            fmt_bnchmrk_repo.commit_pages(website_dir)
+
+
+def run(config: Config):
+    with StepPrinter('Preparing fmt_bnchmrk repository'):
+        fmt_bnchmrk_repo = FmtBnchmrkRepo(config.repositories_dir)
+    with StepPrinter('Preparing {fmt} repository'):
+        fmt_repo = FmtRepo(config.repositories_dir)
+    with StepPrinter('Preparing site generator'):
+        site_generator = SiteGenerator()
+    with StepPrinter('Initializing Docker client'):
+        docker_client = from_env()
+    with StepPrinter('Preparing runners'):
+        runners: List[Runner] = prepare_runners(docker_client)
+
+    with StepPrinter('Preparing A/B baseline'):
+        baseline_dir = prepare_baseline(fmt_repo, config)
+        baseline_dir_name: Optional[str] = baseline_dir.name if baseline_dir is not None else None
+
+    db = prepare_database(config, fmt_bnchmrk_repo, runners)
+    with StepPrinter('Preparing results cache'):
+        results_cache = ResultsCache(config, fmt_bnchmrk_repo.get_commit_hash())
+    with StepPrinter('Preparing outputs archive'):
+        outputs_archive = OutputsArchive(config, fmt_bnchmrk_repo.get_commit_hash()) if config.archive_outputs \
+            else None
+
+    with StepPrinter('Preparing runner containers'):
+        runner_containers = prepare_runner_containers(docker_client, fmt_repo, fmt_bnchmrk_repo, config,
+                                                      baseline_dir_name)
+
+    try:
+        last_hash: str = ''
+        while True:
+            with StepPrinter('Updating {fmt} repository'):
+                fmt_repo.update()
+                commits = fmt_repo.get_available_commits()
+            with db, StepPrinter('Updating commits info from the database'):
+                db.update_commits(commits)
+            with db, StepPrinter('Carrying over cached results'):
+                results_cache.carry_over(db, commits, runners)
+
+            has_non_processed_commits: bool = len([x for x in commits if not x.is_processed]) > 0
+            if has_non_processed_commits:
+                for commit in commits:
+                    for runner in runners:
+                        if commit.is_processed:
+                            continue
+                        with StepPrinter('Executing task on commit "{}" with runner "{}"'.format(commit.hash,
+                                                                                                 runner.name)):
+                            results = execute_task(docker_client, fmt_repo, fmt_bnchmrk_repo, commit, runner, config,
+                                                   baseline_dir_name, runner_containers, outputs_archive)
+                        with db, StepPrinter('Saving results to database'):
+                            db.save_results(commit, runner, results)
+                            results_cache.store(commit, runner, results)
+
+                    new_hash: str = db.calculate_hash()
+                    if last_hash != new_hash:
+                        generate_website(config, db, site_generator, fmt_repo, fmt_bnchmrk_repo, runners)
+                        last_hash = new_hash
+            else:
+                with StepPrinter('Sleeping'):
+                    time.sleep(config.sleep_time)
+    finally:
+        if runner_containers is not None:
+            runner_containers.close()
+
+
+def run_coordinator(config: Config, host: str, port: int, lease_time: float):
+    with StepPrinter('Preparing fmt_bnchmrk repository'):
+        fmt_bnchmrk_repo = FmtBnchmrkRepo(config.repositories_dir)
+    with StepPrinter('Preparing {fmt} repository'):
+        fmt_repo = FmtRepo(config.repositories_dir)
+    with StepPrinter('Preparing site generator'):
+        site_generator = SiteGenerator()
+    with StepPrinter('Initializing Docker client'):
+        docker_client = from_env()
+    with StepPrinter('Preparing runners'):
+        runners: List[Runner] = prepare_runners(docker_client)
+    with StepPrinter('Resolving A/B baseline'):
+        resolve_baseline(fmt_repo, config)
+
+    db = prepare_database(config, fmt_bnchmrk_repo, runners)
+    with StepPrinter('Preparing results cache'):
+        results_cache = ResultsCache(config, fmt_bnchmrk_repo.get_commit_hash())
+
+    coordinator = Coordinator(db, results_cache, runners, fmt_bnchmrk_repo.get_commit_hash(), config, lease_time)
+    with StepPrinter('Starting coordinator on {}:{}'.format(host, port)):
+        coordinator.start(host, port)
 
     last_hash: str = ''
     while True:
         with StepPrinter('Updating {fmt} repository'):
             fmt_repo.update()
             commits = fmt_repo.get_available_commits()
-        with db, StepPrinter('Updating commits info from the database'):
+        with coordinator.lock, db, StepPrinter('Queueing tasks for non-processed commits'):
             db.update_commits(commits)
+            results_cache.carry_over(db, commits, runners)
+            db.enqueue_tasks(commits, runners)
+            pending_tasks_amount: int = db.get_pending_tasks_amount()
 
-        has_non_processed_commits: bool = len([x for x in commits if not x.is_processed]) > 0
-        if has_non_processed_commits:
-            for commit in commits:
-                for runner in runners:
-                    if commit.is_processed:
-                        continue
-                    with StepPrinter('Executing task on commit "{}" with runner "{}"'.format(commit.hash, runner.name)):
-                        results = execute_task(docker_client, fmt_repo, fmt_bnchmrk_repo, commit, runner, config)
-                    with db, StepPrinter('Saving results to database'):
-                        db.save_results(commit, runner, results)
-
-                new_hash: str = db.calculate_hash()
-                if last_hash != new_hash:
-                    if config.website_output_dir is None:
-                        temp_dir = tempfile.TemporaryDirectory()
-                        website_dir = temp_dir.name
-                    else:
-                        website_dir = config.website_output_dir
-                    with db, StepPrinter('Generating website'):
-                        site_generator.generate(db, fmt_repo, runners, website_dir)
-                        if config.commit_bnchmrk_pages:
-                            fmt_bnchmrk_repo.commit_pages(website_dir)
-                        last_hash = new_hash
-        else:
-            with StepPrinter('Sleeping'):
-                time.sleep(config.sleep_time)
+        with coordinator.lock:
+            new_hash: str = db.calculate_hash()
+            if last_hash != new_hash:
+                generate_website(config, db, site_generator, fmt_repo, fmt_bnchmrk_repo, runners)
+                last_hash = new_hash
+
+        with StepPrinter('Sleeping, {} task(s) are pending'.format(pending_tasks_amount)):
+            time.sleep(config.sleep_time)
+
+
+def run_reingest(config: Config):
+    with StepPrinter('Preparing fmt_bnchmrk repository'):
+        fmt_bnchmrk_repo = FmtBnchmrkRepo(config.repositories_dir)
+    with StepPrinter('Preparing {fmt} repository'):
+        fmt_repo = FmtRepo(config.repositories_dir)
+    with StepPrinter('Preparing site generator'):
+        site_generator = SiteGenerator()
+    with StepPrinter('Initializing Docker client'):
+        docker_client = from_env()
+    with StepPrinter('Preparing runners'):
+        runners: List[Runner] = prepare_runners(docker_client)
+    with StepPrinter('Resolving A/B baseline'):
+        resolve_baseline(fmt_repo, config)
+
+    db = prepare_database(config, fmt_bnchmrk_repo, runners)
+    with StepPrinter('Preparing results cache'):
+        results_cache = ResultsCache(config, fmt_bnchmrk_repo.get_commit_hash())
+    with StepPrinter('Preparing outputs archive'):
+        outputs_archive = OutputsArchive(config, fmt_bnchmrk_repo.get_commit_hash())
+
+    with StepPrinter('Looking up archived outputs'):
+        commits = fmt_repo.get_available_commits()
+        reingested_commits: List[Commit] = list()
+        tasks: List[Tuple[Commit, Runner, Optional[str]]] = list()
+        for commit in commits:
+            archived_outputs = [outputs_archive.load(commit, runner) for runner in runners]
+            # a commit is either rebuilt for all runners or left as is, same as in the results cache
+            if not all(is_archived for is_archived, _ in archived_outputs):
+                continue
+            reingested_commits.append(commit)
+            for runner, (_, object_hash) in zip(runners, archived_outputs):
+                object_path = outputs_archive.get_object_path(object_hash) if object_hash is not None else None
+                tasks.append((commit, runner, object_path))
+
+    with StepPrinter('Parsing {} archived task outputs'.format(len(tasks))):
+        with ProcessPoolExecutor(max_workers=config.max_threads) as executor:
+            tasks_results = list(executor.map(parse_archived_outputs, [object_path for _, _, object_path in tasks],
+                                              chunksize=8))
+
+    with db, StepPrinter('Rebuilding results of {} commits'.format(len(reingested_commits))):
+        for commit in reingested_commits:
+            db.remove_results(commit)
+        for (commit, runner, _), results in zip(tasks, tasks_results):
+            db.save_results(commit, runner, results)
+            results_cache.store(commit, runner, results)
+
+    generate_website(config, db, site_generator, fmt_repo, fmt_bnchmrk_repo, runners)
+
+
+def run_generate(config: Config, db_file_path: str):
+    with StepPrinter('Preparing fmt_bnchmrk repository'):
+        fmt_bnchmrk_repo = FmtBnchmrkRepo(config.repositories_dir)
+    with StepPrinter('Preparing {fmt} repository'):
+        fmt_repo = FmtRepo(config.repositories_dir)
+    with StepPrinter('Preparing site generator'):
+        site_generator = SiteGenerator()
+
+    db = Database.from_file(db_file_path)
+    with db, StepPrinter('Reading runners from database "{}"'.format(db_file_path)):
+        runners: List[Runner] = db.get_runners()
+    generate_website(config, db, site_generator, fmt_repo, fmt_bnchmrk_repo, runners)
 
 
 def main():
@@ -218,12 +264,82 @@ def main():
                         default=Config.default_skip_faulty_commits,
                         help='skip commits that cannot be processed\n'
                              '(default: "{}")'.format(Config.default_skip_faulty_commits))
+    parser.add_argument('--repositories-dir', dest='repositories_dir', type=str,
+                        default=Config.default_repositories_dir,
+                        help='directory to keep {fmt} and fmt_bnchmrk mirrors in, so they are only fetched on the next '
+                             'start\n(default: repositories are cloned to temporary directories)')
+    parser.add_argument('--compiler-time-report', dest='compiler_time_report', type=boolean_string,
+                        default=Config.default_compiler_time_report,
+                        help='build format.o once more with compiler timing reports to get compilation phases '
+                             'breakdown\n(default: "{}")'.format(Config.default_compiler_time_report))
+    parser.add_argument('--ab-baseline', dest='ab_baseline', type=str, default=Config.default_ab_baseline,
+                        help='{fmt} commit (or tag, branch) to run benchmark suites interleaved with, paired ratios to '
+                             'it are saved as well, it\'s resolved to a commit hash on start\n'
+                             '(default: A/B mode is disabled)')
+    parser.add_argument('--persistent-containers', dest='persistent_containers', type=boolean_string,
+                        default=Config.default_persistent_containers,
+                        help='execute tasks in long-lived runner containers instead of starting a new container for '
+                             'each task\n(default: "{}")'.format(Config.default_persistent_containers))
+    parser.add_argument('--container-recycle-tasks', dest='container_recycle_tasks', type=int,
+                        default=Config.default_container_recycle_tasks,
+                        help='amount of tasks after which a long-lived runner container is replaced with a new one\n'
+                             '(default: {})'.format(Config.default_container_recycle_tasks))
+    parser.add_argument('--archive-outputs', dest='archive_outputs', type=boolean_string,
+                        default=Config.default_archive_outputs,
+                        help='keep compressed raw outputs of each task, so results can be rebuilt with the '
+                             '`reingest` command\n(default: "{}")'.format(Config.default_archive_outputs))
+
+    subparsers = parser.add_subparsers(dest='command', metavar='command',
+                                       help='command to execute, benchmarks are running if not provided')
+    merge_parser = subparsers.add_parser('merge', help='merge databases produced on multiple machines into one')
+    merge_parser.add_argument('output', type=str,
+                              help='database file to merge into, created if it doesn\'t exist')
+    merge_parser.add_argument('inputs', type=str, nargs='+', help='database files to merge')
+    generate_parser = subparsers.add_parser('generate',
+                                            help='generate website from the given database, e.g. a merged one')
+    generate_parser.add_argument('database', type=str, help='database file to generate website from')
+    subparsers.add_parser('reingest', help='rebuild results from raw outputs archived on this host without re-running '
+                                           'tasks')
+    coordinator_parser = subparsers.add_parser('coordinator', formatter_class=argparse.RawTextHelpFormatter,
+                                               help='keep the tasks queue and lease tasks to workers')
+    coordinator_parser.add_argument('--host', dest='host', type=str, default=Coordinator.default_host,
+                                    help='address to listen on\n(default: "{}")'.format(Coordinator.default_host))
+    coordinator_parser.add_argument('--port', dest='port', type=int, default=Coordinator.default_port,
+                                    help='port to listen on\n(default: {})'.format(Coordinator.default_port))
+    coordinator_parser.add_argument('--lease-time', dest='lease_time', type=float,
+                                    default=Coordinator.default_lease_time,
+                                    help='time in seconds after which a task without worker heartbeats is leased '
+                                         'again\n(default: {})'.format(Coordinator.default_lease_time))
+    worker_parser = subparsers.add_parser('worker', formatter_class=argparse.RawTextHelpFormatter,
+                                          help='execute tasks leased from a coordinator')
+    worker_parser.add_argument('--coordinator-url', dest='coordinator_url', type=str,
+                               default='http://{}:{}'.format(Coordinator.default_host, Coordinator.default_port),
+                               help='URL of the coordinator\n(default: "http://{}:{}")'.format(
+                                   Coordinator.default_host, Coordinator.default_port))
+    worker_parser.add_argument('--name', dest='worker_name', type=str, default=get_default_worker_name(),
+                               help='name of this worker\n(default: "<hostname>-<pid>")')
 
     args = parser.parse_args()
+    if args.command == 'merge':
+        with StepPrinter('Merging {} database(s) into "{}"'.format(len(args.inputs), args.output)):
+            merge_databases(args.output, args.inputs)
+        return
+
     config: Config = Config(args.max_threads, args.compilation_runs, args.compilations_pause, args.benchmark_runs,
                             args.sleep_time, args.commit_bnchmrk_pages, args.website_output_dir, args.database_dir,
-                            args.skip_faulty_commits)
-    run(config)
+                            args.skip_faulty_commits, args.repositories_dir,
+                            args.compiler_time_report, args.ab_baseline, args.persistent_containers,
+                            args.container_recycle_tasks, args.archive_outputs)
+    if args.command == 'coordinator':
+        run_coordinator(config, args.host, args.port, args.lease_time)
+    elif args.command == 'generate':
+        run_generate(config, args.database)
+    elif args.command == 'reingest':
+        run_reingest(config)
+    elif args.command == 'worker':
+        run_worker(config, args.coordinator_url, args.worker_name)
+    else:
+        run(config)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import sqlite3
+import tarfile
+import tempfile
+from typing import Optional, Tuple
+
+from classes import Runner, Commit, Config
+
+
+class OutputsArchive:
+    directory_name: str = 'outputs_archive'
+    index_file_name: str = 'index.db'
+
+    def __init__(self, config: Config, bnchmrk_commit_hash: str):
+        self.directory: str = os.path.join(config.database_dir, OutputsArchive.directory_name)
+        self.objects_directory: str = os.path.join(self.directory, 'objects')
+        self.index_file_path: str = os.path.join(self.directory, OutputsArchive.index_file_name)
+        self.config: Config = config
+        self.bnchmrk_commit_hash: str = bnchmrk_commit_hash
+        os.makedirs(self.objects_directory, exist_ok=True)
+        connection = sqlite3.connect(self.index_file_path)
+        connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS archived_outputs
+            (
+                key TEXT NOT NULL PRIMARY KEY,
+                commit_hash TEXT NOT NULL,
+                runner_name TEXT NOT NULL,
+                object_hash TEXT
+            )
+            ''')
+        connection.commit()
+        connection.close()
+
+    def get_key(self, commit: Commit, runner: Runner) -> str:
+        # same inputs as the results cache key, but raw outputs don't depend on the parsing version
+        hash_sha256 = hashlib.sha256()
+        hash_sha256.update(commit.hash.encode('utf-8'))
+        hash_sha256.update(runner.docker_ID.encode('utf-8'))
+        hash_sha256.update(self.bnchmrk_commit_hash.encode('utf-8'))
+        hash_sha256.update(self.config.as_measurement_bytes())
+        return hash_sha256.hexdigest()
+
+    def get_object_path(self, object_hash: str) -> str:
+        return os.path.join(self.objects_directory, object_hash[:2], '{}.tar.xz'.format(object_hash))
+
+    @staticmethod
+    def _normalize_tar_info_(tar_info: tarfile.TarInfo) -> tarfile.TarInfo:
+        # files are written by root in the container at arbitrary time, so the same outputs get the same object
+        tar_info.mtime = 0
+        tar_info.uid = tar_info.gid = 0
+        tar_info.uname = tar_info.gname = ''
+        return tar_info
+
+    def _store_object_(self, outputs_dir_name: str) -> str:
+        with tempfile.NamedTemporaryFile(dir=self.objects_directory, delete=False) as object_file:
+            with tarfile.open(fileobj=object_file, mode='w:xz') as archive:
+                for root, directories, files in os.walk(outputs_dir_name):
+                    directories.sort()
+                    for file_name in sorted(files):
+                        file_path = os.path.join(root, file_name)
+                        archive.add(file_path, arcname=os.path.relpath(file_path, outputs_dir_name),
+                                    filter=OutputsArchive._normalize_tar_info_)
+        hash_sha256 = hashlib.sha256()
+        with open(object_file.name, 'rb') as f:
+            for chunk in iter(lambda: f.read(4096), b""):
+                hash_sha256.update(chunk)
+        object_hash: str = hash_sha256.hexdigest()
+        object_path: str = self.get_object_path(object_hash)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        os.replace(object_file.name, object_path)
+        return object_hash
+
+    def store(self, commit: Commit, runner: Runner, outputs_dir_name: Optional[str]):
+        object_hash: Optional[str] = None
+        if outputs_dir_name is not None:
+            object_hash = self._store_object_(outputs_dir_name)
+        connection = sqlite3.connect(self.index_file_path)
+        connection.execute('INSERT OR REPLACE INTO archived_outputs (key, commit_hash, runner_name, object_hash) '
+                           'VALUES (?, ?, ?, ?);', (self.get_key(commit, runner), commit.hash, runner.name, object_hash))
+        connection.commit()
+        connection.close()
+
+    def load(self, commit: Commit, runner: Runner) -> Tuple[bool, Optional[str]]:
+        connection = sqlite3.connect(self.index_file_path)
+        exec_result = list(connection.execute('SELECT object_hash FROM archived_outputs WHERE key = ?;',
+                                              (self.get_key(commit, runner),)))
+        connection.close()
+        if len(exec_result) == 0:
+            return False, None
+        return True, exec_result[0][0]  # no object for faulty commit
+
+
+def extract_object(object_path: str, directory: str):
+    with tarfile.open(object_path, mode='r:xz') as archive:
+        # objects can be copied from other hosts, so nothing is extracted outside of the directory
+        archive.extractall(directory, filter='data')
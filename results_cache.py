@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import sqlite3
+from typing import List, Optional, Tuple
+
+from classes import Runner, Commit, Config
+from database import Database
+
+# should be incremented each time results parsing is changed, so cached results are not reused after that
+results_version: int = 3
+
+
+class ResultsCache:
+    file_name: str = 'results_cache.db'
+
+    def __init__(self, config: Config, bnchmrk_commit_hash: str):
+        self.file_path: str = os.path.join(config.database_dir, ResultsCache.file_name)
+        self.config: Config = config
+        self.bnchmrk_commit_hash: str = bnchmrk_commit_hash
+        connection = sqlite3.connect(self.file_path)
+        connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS cached_results
+            (
+                key TEXT NOT NULL PRIMARY KEY,
+                results TEXT
+            )
+            ''')
+        connection.commit()
+        connection.close()
+
+    def get_key(self, commit: Commit, runner: Runner) -> str:
+        hash_sha256 = hashlib.sha256()
+        hash_sha256.update(commit.hash.encode('utf-8'))
+        hash_sha256.update(runner.docker_ID.encode('utf-8'))
+        hash_sha256.update(self.bnchmrk_commit_hash.encode('utf-8'))
+        hash_sha256.update(self.config.as_measurement_bytes())
+        hash_sha256.update(str(results_version).encode('utf-8'))
+        return hash_sha256.hexdigest()
+
+    @staticmethod
+    def _load_(connection: sqlite3.Connection, key: str) -> Tuple[bool, Optional[List[Tuple[str, float]]]]:
+        exec_result = list(connection.execute('SELECT results FROM cached_results WHERE key = ?;', (key,)))
+        if len(exec_result) == 0:
+            return False, None
+        if exec_result[0][0] is None:
+            return True, None  # faulty commit
+        return True, [(name, value) for name, value in json.loads(exec_result[0][0])]
+
+    def store(self, commit: Commit, runner: Runner, results: Optional[List[Tuple[str, float]]]):
+        connection = sqlite3.connect(self.file_path)
+        connection.execute('INSERT OR REPLACE INTO cached_results (key, results) VALUES (?, ?);',
+                           (self.get_key(commit, runner), None if results is None else json.dumps(results)))
+        connection.commit()
+        connection.close()
+
+    def carry_over(self, db: Database, commits: List[Commit], runners: List[Runner]) -> int:
+        carried_over_amount: int = 0
+        connection = sqlite3.connect(self.file_path)
+        for commit in commits:
+            if commit.is_processed:
+                continue
+            cached_results = [self._load_(connection, self.get_key(commit, runner)) for runner in runners]
+            if not all(is_cached for is_cached, _ in cached_results):
+                continue
+            for runner, (_, results) in zip(runners, cached_results):
+                db.save_results(commit, runner, results)
+            commit.is_processed = True
+            carried_over_amount += 1
+        connection.close()
+        return carried_over_amount
@@ -0,0 +1,83 @@
+import os
+import tempfile
+from typing import Dict, Optional
+
+from docker import DockerClient, errors
+from docker.models.containers import Container
+
+from classes import Runner
+from fmt_bnchmrk_git_repository import FmtBnchmrkRepo
+from fmt_git_repository import FmtRepo
+
+
+class RunnerContainers:
+    outputs_bind: str = '/outputs'
+
+    def __init__(self, docker_client: DockerClient, fmt_repo: FmtRepo, fmt_bnchmrk_repo: FmtBnchmrkRepo,
+                 baseline_dir_name: Optional[str], recycle_tasks: int):
+        self.docker_client: DockerClient = docker_client
+        # checkouts are changed in place, so they are mounted once, each task gets its own output subdirectory
+        self.outputs_dir = tempfile.TemporaryDirectory()
+        self.volumes = {
+            fmt_repo.get_directory(): {'bind': '/fmt', 'mode': 'ro'},
+            fmt_bnchmrk_repo.get_directory(): {'bind': '/benchmarks', 'mode': 'ro'},
+            self.outputs_dir.name: {'bind': RunnerContainers.outputs_bind, 'mode': 'rw'},
+        }
+        if baseline_dir_name is not None:
+            self.volumes[baseline_dir_name] = {'bind': '/fmt_baseline', 'mode': 'ro'}
+        self.recycle_tasks: int = recycle_tasks
+        self.containers: Dict[str, Container] = dict()
+        self.executed_tasks: Dict[str, int] = dict()
+
+    def _start_(self, runner: Runner, image_name: str) -> Container:
+        container = self.docker_client.containers.run(image_name, command=['sleep', 'infinity'], detach=True,
+                                                      volumes=self.volumes, init=True)
+        self.containers[runner.name] = container
+        self.executed_tasks[runner.name] = 0
+        return container
+
+    def _is_healthy_(self, container: Container) -> bool:
+        try:
+            container.reload()
+            return container.status == 'running' and container.exec_run(['true']).exit_code == 0
+        except errors.APIError:
+            return False
+
+    def recycle(self, runner: Runner):
+        container = self.containers.pop(runner.name, None)
+        if container is None:
+            return
+        try:
+            container.remove(force=True)
+        except errors.APIError:
+            pass  # it's already gone
+
+    def get_output_dir(self) -> tempfile.TemporaryDirectory:
+        return tempfile.TemporaryDirectory(dir=self.outputs_dir.name)
+
+    def execute(self, runner: Runner, image_name: str, output_dir_name: str, environment: Dict):
+        container: Optional[Container] = self.containers.get(runner.name)
+        if container is not None and \
+                (self.executed_tasks[runner.name] >= self.recycle_tasks or not self._is_healthy_(container)):
+            self.recycle(runner)
+            container = None
+        if container is None:
+            container = self._start_(runner, image_name)
+
+        environment = dict(environment)
+        environment['RUNNER_OUTPUT_DIR'] = '{}/{}'.format(RunnerContainers.outputs_bind,
+                                                          os.path.basename(output_dir_name))
+        command = ['./run.sh']
+        exec_result = container.exec_run(command, environment=environment, workdir='/')
+        self.executed_tasks[runner.name] += 1
+        if exec_result.exit_code != 0:
+            self.recycle(runner)  # the failed task may leave the container in any state
+            raise errors.ContainerError(container, exec_result.exit_code, command, image_name, exec_result.output)
+
+    def close(self):
+        for container in list(self.containers.values()):
+            try:
+                container.remove(force=True)
+            except errors.APIError:
+                pass
+        self.containers.clear()
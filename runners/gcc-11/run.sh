@@ -1,28 +1,52 @@
 #!/bin/bash -ex
 
+# 0. the same container can be reused for several tasks, so everything left from the previous one is removed
+output_dir="${RUNNER_OUTPUT_DIR:-/output}"
+work_dir="$(mktemp -d)"
+trap 'rm -rf "$work_dir"' EXIT
+rm -rf /usr/local/include/fmt /usr/local/lib/libfmt* /usr/local/lib/cmake/fmt /opt/fmt_baseline
+
 # 1. gathering library stat
 
 # 1.1. build format.o several times to get average compilation time
-cd "$(mktemp -d)"
+cd "$(mktemp -d -p "$work_dir")"
 cmake -DCMAKE_BUILD_TYPE=Release -DCMAKE_CXX_STANDARD=20 -DFMT_DOC=OFF -DFMT_TEST=OFF /fmt
 cmake --build . --target src/format.o
 for i in $(eval echo "{1..$RUNNER_COMPILATION_RUNS}"); do
     cmake --build . --target clean
     sleep "$RUNNER_COMPILATION_PAUSE"
-    { time cmake --build . --target src/format.o ; } 2> "/output/compilation_time_$i.txt"
+    { time /usr/bin/time -v -o "$output_dir/compilation_resources_$i.txt" cmake --build . --target src/format.o ; } \
+        2> "$output_dir/compilation_time_$i.txt"
 done
 
+# 1.1.1. build format.o once more with compiler timing reports to get compilation phases breakdown
+if [ "$RUNNER_COMPILER_TIME_REPORT" = "1" ]; then
+    cd "$(mktemp -d -p "$work_dir")"
+    if c++ --version | grep -q clang; then
+        cmake -DCMAKE_BUILD_TYPE=Release -DCMAKE_CXX_STANDARD=20 -DFMT_DOC=OFF -DFMT_TEST=OFF -DCMAKE_CXX_FLAGS=-ftime-trace /fmt
+        cmake --build . --target src/format.o
+        find . -name 'format.cc.json' -exec cp {} "$output_dir/compiler_time_trace.json" \;
+    else
+        cmake -DCMAKE_BUILD_TYPE=Release -DCMAKE_CXX_STANDARD=20 -DFMT_DOC=OFF -DFMT_TEST=OFF -DCMAKE_CXX_FLAGS=-ftime-report /fmt
+        cmake --build . --target src/format.o 2> "$output_dir/compiler_time_report.txt"
+    fi
+fi
+
 # 1.3. build libfmt.so to get shared library size
-cd "$(mktemp -d)"
+cd "$(mktemp -d -p "$work_dir")"
 cmake -DCMAKE_BUILD_TYPE=Release -DCMAKE_CXX_STANDARD=20 -DFMT_DOC=OFF -DFMT_TEST=OFF -DBUILD_SHARED_LIBS=ON /fmt
 cmake --build . --target fmt -- -j"$RUNNER_MAX_THREADS"
-stat --printf="%s" -L ./libfmt.so > /output/shared_library_size.txt
+stat --printf="%s" -L ./libfmt.so > "$output_dir/shared_library_size.txt"
+nm --size-sort --radix=d -C ./libfmt.so > "$output_dir/shared_library_symbols.txt"
+size -A -d ./libfmt.so > "$output_dir/shared_library_sections.txt"
 
 # 1.2. build libfmt.a to get static library size
-cd "$(mktemp -d)"
+cd "$(mktemp -d -p "$work_dir")"
 cmake -DCMAKE_BUILD_TYPE=Release -DCMAKE_CXX_STANDARD=20 -DFMT_DOC=OFF -DFMT_TEST=OFF -DBUILD_SHARED_LIBS=OFF /fmt
 cmake --build . --target fmt -- -j"$RUNNER_MAX_THREADS"
-stat --printf="%s" -L ./libfmt.a > /output/static_library_size.txt
+stat --printf="%s" -L ./libfmt.a > "$output_dir/static_library_size.txt"
+nm --size-sort --radix=d -C ./libfmt.a > "$output_dir/static_library_symbols.txt"
+size -A -d ./libfmt.a > "$output_dir/static_library_sections.txt"
 # 🠗🠗🠗 we will use libfmt.a in the next step 🠗🠗🠗
 
 
@@ -32,12 +56,47 @@ stat --printf="%s" -L ./libfmt.a > /output/static_library_size.txt
 # 🠕🠕🠕 we are using libfmt.a from the previous step 🠕🠕🠕
 cmake --build . --target install -- -j"$RUNNER_MAX_THREADS"
 
-# 2.2. then we can build and test benchmark suites
-cd "$(mktemp -d)"
+# 2.2. then we can build benchmark suites
+cd "$(mktemp -d -p "$work_dir")"
+candidate_benchmarks_dir="$(pwd)"
 cmake -G "Unix Makefiles" -DCMAKE_BUILD_TYPE=Release -DCMAKE_CXX_STANDARD=20 /benchmarks
 make all -k -j"$RUNNER_MAX_THREADS" || true  # keep on errors so we can get at least some results
+
+# 2.3. in A/B mode baseline {fmt} and benchmark suites are built ahead of time too, so they can be run interleaved
+if [ "$RUNNER_AB_MODE" = "1" ]; then
+    cd "$(mktemp -d -p "$work_dir")"
+    cmake -DCMAKE_BUILD_TYPE=Release -DCMAKE_CXX_STANDARD=20 -DFMT_DOC=OFF -DFMT_TEST=OFF -DBUILD_SHARED_LIBS=OFF \
+        -DCMAKE_INSTALL_PREFIX=/opt/fmt_baseline /fmt_baseline
+    cmake --build . --target install -- -j"$RUNNER_MAX_THREADS"
+
+    cd "$(mktemp -d -p "$work_dir")"
+    baseline_benchmarks_dir="$(pwd)"
+    cmake -G "Unix Makefiles" -DCMAKE_BUILD_TYPE=Release -DCMAKE_CXX_STANDARD=20 -DCMAKE_PREFIX_PATH=/opt/fmt_baseline \
+        /benchmarks
+    make all -k -j"$RUNNER_MAX_THREADS" || true
+    mkdir -p "$output_dir/baseline"
+fi
+
+# 2.4. and run them, in A/B mode each suite run is paired with the baseline one, their order is alternated
+run_candidate_suite() {
+    "$candidate_benchmarks_dir/output/$1" --benchmark_out="$output_dir/$1_results_$2.json" --benchmark_out_format=json
+}
+run_baseline_suite() {
+    "$baseline_benchmarks_dir/output/$1" --benchmark_out="$output_dir/baseline/$1_results_$2.json" --benchmark_out_format=json
+}
 for i in $(eval echo "{1..$RUNNER_BENCHMARK_RUNS}"); do
-    for suite_executable in output/*; do
-        $suite_executable --benchmark_out="/output/$(basename -- "$suite_executable")_results_$i.json" --benchmark_out_format=json
+    for suite_executable in "$candidate_benchmarks_dir"/output/*; do
+        suite_name="$(basename -- "$suite_executable")"
+        if [ "$RUNNER_AB_MODE" = "1" ] && [ -x "$baseline_benchmarks_dir/output/$suite_name" ]; then
+            if [ $((i % 2)) -eq 1 ]; then
+                run_candidate_suite "$suite_name" "$i"
+                run_baseline_suite "$suite_name" "$i"
+            else
+                run_baseline_suite "$suite_name" "$i"
+                run_candidate_suite "$suite_name" "$i"
+            fi
+        else
+            run_candidate_suite "$suite_name" "$i"
+        fi
     done
 done
@@ -0,0 +1,31 @@
+const getCellValue = (row, index) => {
+  let cell = row.children[index];
+  return cell.dataset.value !== undefined ? cell.dataset.value : cell.textContent.trim();
+};
+
+const sortTable = (table, header, index) => {
+  let isNumber = header.dataset.sortType === 'number';
+  let isAscending = header.dataset.sortOrder !== 'ascending';
+  for (let otherHeader of table.querySelectorAll('th')) {
+    delete otherHeader.dataset.sortOrder;
+  }
+  header.dataset.sortOrder = isAscending ? 'ascending' : 'descending';
+
+  let body = table.tBodies[0];
+  let rows = Array.from(body.rows);
+  rows.sort((left, right) => {
+    let leftValue = getCellValue(left, index);
+    let rightValue = getCellValue(right, index);
+    let result = isNumber ? parseFloat(leftValue) - parseFloat(rightValue) : leftValue.localeCompare(rightValue);
+    return isAscending ? result : -result;
+  });
+  for (let row of rows) {
+    body.appendChild(row);
+  }
+};
+
+for (let table of document.querySelectorAll('.sortable-table')) {
+  table.querySelectorAll('th').forEach((header, index) => {
+    header.addEventListener('click', () => sortTable(table, header, index));
+  });
+}
@@ -1,6 +1,8 @@
 import os.path
 import re
-from typing import List, Tuple, Optional, Set
+import statistics
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple, Optional, Set
 
 from css_html_js_minify import html_minify, css_minify
 from jinja2 import Environment, FileSystemLoader, select_autoescape, Template
@@ -49,7 +51,8 @@ class Page:
                  patterns: List[re.Pattern],
                  icon: str,
                  is_multi_axes: bool = False,
-                 slug: Optional[str] = None):
+                 slug: Optional[str] = None,
+                 is_stacked: bool = False):
         self.template_html: Template = template_html
         self.template_js: Optional[Template] = template_js
 
@@ -61,6 +64,7 @@ class Page:
 
         self.slug: str = slugify(self.name) if slug is None else slug
         self.is_multi_axes: bool = is_multi_axes
+        self.is_stacked: bool = is_stacked
 
     def get_match_or_none(self, result) -> Optional[re.Match]:
         matches = [re.match(pattern, result[2]) for pattern in self.patterns if re.match(pattern, result[2])]
@@ -103,7 +107,8 @@ class Page:
         result_js = self.template_js.render(benchmarks=benchmarks,
                                             results=prepared_results,
                                             description=self.description,
-                                            is_multi_axes=self.is_multi_axes)
+                                            is_multi_axes=self.is_multi_axes,
+                                            is_stacked=self.is_stacked)
         result_js = jsmin(result_js)
         with open(os.path.join(directory, '{}.html'.format(self.slug)), 'w') as html_file:
             html_file.write(result_html)
@@ -122,6 +127,64 @@ class CompilationTimePage(Page):
                       icon='bi-stopwatch-fill')
 
 
+class CompilationPhasesPage(Page):
+    def __init__(self):
+        Page.__init__(self,
+                      template_html=Page.default_template_html,
+                      template_js=Page.default_template_js,
+                      name='Compilation phases',
+                      description='format.o compilation time breakdown by compiler phases, in seconds',
+                      patterns=[re.compile(r'^compilation_phase_(?P<name>.*)$')],
+                      icon='bi-stack',
+                      is_stacked=True)
+
+
+class CompilerTimevarsPage(Page):
+    def __init__(self):
+        Page.__init__(self,
+                      template_html=Page.default_template_html,
+                      template_js=Page.default_template_js,
+                      name='Compiler timevars',
+                      description='format.o compilation time of selected GCC timevars (they overlap compiler '
+                                  'phases), in seconds',
+                      patterns=[re.compile(r'^compiler_timevar_(?P<name>.*)$')],
+                      icon='bi-hourglass-split')
+
+
+class CompilationCpuTimePage(Page):
+    def __init__(self):
+        Page.__init__(self,
+                      template_html=Page.default_template_html,
+                      template_js=Page.default_template_js,
+                      name='Compilation CPU time',
+                      description='format.o compilation wall, user and system CPU time, in seconds',
+                      patterns=[re.compile(r'^compilation_(?P<name>wall|user|system)_time$')],
+                      icon='bi-cpu-fill')
+
+
+class CompilationMemoryPage(Page):
+    def __init__(self):
+        Page.__init__(self,
+                      template_html=Page.default_template_html,
+                      template_js=Page.default_template_js,
+                      name='Compilation memory',
+                      description='format.o compilation peak resident set size, in bytes',
+                      patterns=[re.compile(r'^compilation_(?P<name>peak_rss)$')],
+                      icon='bi-memory')
+
+
+class CompilationContextSwitchesPage(Page):
+    def __init__(self):
+        Page.__init__(self,
+                      template_html=Page.default_template_html,
+                      template_js=Page.default_template_js,
+                      name='Compilation context switches',
+                      description='format.o compilation voluntary and involuntary context switches',
+                      patterns=[re.compile(r'^compilation_(?P<name>(in|)voluntary)_context_switches$')],
+                      icon='bi-arrow-left-right',
+                      is_multi_axes=True)
+
+
 class LibrarySizePage(Page):
     def __init__(self):
         Page.__init__(self,
@@ -134,6 +197,177 @@ class LibrarySizePage(Page):
                       is_multi_axes=True)
 
 
+class LibrarySectionsPage(Page):
+    def __init__(self, library: str):
+        Page.__init__(self,
+                      template_html=Page.default_template_html,
+                      template_js=Page.default_template_js,
+                      name='Library sections • {}'.format(library),
+                      description='Size of libfmt.{} sections, in bytes'.format('a' if library == 'static' else 'so'),
+                      patterns=[re.compile(r'^{}_library_section_(?P<name>.*)$'.format(library))],
+                      icon='bi-file-earmark-zip')
+
+
+class SymbolSizesPage(Page):
+    default_template_html: Template = None
+    default_template_js: Template = None
+
+    def __init__(self, runner_id: int):
+        Page.__init__(self,
+                      template_html=SymbolSizesPage.default_template_html,
+                      template_js=SymbolSizesPage.default_template_js,
+                      name='Library symbols',
+                      description='Changes of libfmt symbols sizes between commits',
+                      patterns=[],
+                      icon='bi-file-earmark-diff-fill')
+        self.runner_id: int = runner_id
+
+    def generate(self, filtered_results, pages, fmt_repo: FmtRepo, db: Database, directory: str):
+        libraries: List[str] = ['static', 'shared']
+        commits: List[Result] = list()
+        sizes: List[Dict[Tuple[int, str], int]] = list()
+        for row in db.get_symbol_sizes_for(self.runner_id):
+            commit_hash, _, commit_timepoint, library, symbol_name, symbol_size = row
+            if len(commits) == 0 or commits[-1].commit_hash != commit_hash:
+                if len(commits) == classes.commits_number_limit:
+                    break
+                message = fmt_repo.get_commit_message(commit_hash)
+                commits.append(Result(commit_hash, message.split('\n', 1)[0], commit_timepoint))
+                sizes.append(dict())
+            sizes[-1][(libraries.index(library), symbol_name)] = symbol_size
+        commits.reverse()
+        sizes.reverse()
+
+        # only changed symbols are passed to the page, each commit is compared with the previous one
+        symbols: List[str] = list()
+        symbols_indices: Dict[str, int] = dict()
+        diffs: List[List[Tuple[int, int, int, int]]] = [[]]
+        for previous_sizes, current_sizes in zip(sizes, sizes[1:]):
+            diff: List[Tuple[int, int, int, int]] = list()
+            for key in set(previous_sizes) | set(current_sizes):
+                size_before: int = previous_sizes.get(key, 0)
+                size_after: int = current_sizes.get(key, 0)
+                if size_before == size_after:
+                    continue
+                library_index, symbol_name = key
+                if symbol_name not in symbols_indices:
+                    symbols_indices[symbol_name] = len(symbols)
+                    symbols.append(symbol_name)
+                diff.append((library_index, symbols_indices[symbol_name], size_before, size_after))
+            diff.sort(key=lambda change: abs(change[3] - change[2]), reverse=True)
+            diffs.append(diff)
+
+        result_html = self.template_html.render(pages=pages,
+                                                script_prefix=self.slug,
+                                                current_page_name=self.name,
+                                                libraries=libraries)
+        result_html = html_minify(result_html)
+        result_js = self.template_js.render(commits=commits,
+                                            symbols=symbols,
+                                            diffs=diffs)
+        result_js = jsmin(result_js)
+        with open(os.path.join(directory, '{}.html'.format(self.slug)), 'w') as html_file:
+            html_file.write(result_html)
+        with open(os.path.join(directory, 'script-{}.js'.format(self.slug)), 'w') as js_file:
+            js_file.write(result_js)
+
+
+class CommitDelta:
+    def __init__(self, name: str, value: float, previous_value: Optional[float], noise: float):
+        self.name: str = name
+        self.value: float = value
+        self.previous_value: Optional[float] = previous_value
+        self.delta: Optional[float] = None if previous_value is None else value - previous_value
+        self.relative_delta: Optional[float] = None
+        if previous_value:
+            self.relative_delta = self.delta / previous_value * 100
+
+        # all metrics are "lower is better", change is significant if it is well above usual commit-to-commit noise
+        self.significance: int = 0
+        if self.delta is not None and abs(self.delta) > CommitsPage.noise_factor * noise:
+            self.significance = 1 if self.delta > 0 else -1
+
+
+class CommitDetails(Result):
+    def __init__(self, commit_hash: str, commit_message: str, commit_timepoint: int, deltas: List[CommitDelta]):
+        Result.__init__(self, commit_hash, commit_message, commit_timepoint)
+        self.commit_date: str = datetime.fromtimestamp(commit_timepoint, timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+        self.deltas: List[CommitDelta] = deltas
+        self.regressions: int = len([delta for delta in deltas if delta.significance > 0])
+        self.improvements: int = len([delta for delta in deltas if delta.significance < 0])
+
+
+class CommitsPage(Page):
+    default_template_html: Template = None
+    commit_template_html: Template = None
+    noise_factor: float = 3.0
+
+    def __init__(self):
+        Page.__init__(self,
+                      template_html=CommitsPage.default_template_html,
+                      template_js=None,
+                      name='Commits',
+                      description='Processed commits with changes of every metric',
+                      patterns=[],
+                      icon='bi-list-check')
+
+    def filter_results(self, sorted_results):
+        return sorted_results
+
+    @staticmethod
+    def get_commit_page_name(commit_hash: str) -> str:
+        return 'commit-{}.html'.format(commit_hash)
+
+    def generate(self, filtered_results, pages, fmt_repo: FmtRepo, db: Database, directory: str):
+        # results matrix, commit by metric, it is built and then processed in a single pass over all results
+        commits_hashes: List[str] = list()
+        values: Dict[str, Dict[str, float]] = dict()
+        for commit_hash, _, name, value in filtered_results:
+            if commit_hash not in values:
+                commits_hashes.append(commit_hash)
+                values[commit_hash] = dict()
+            values[commit_hash][name] = value
+
+        previous_values: Dict[str, float] = dict()
+        previous_values_by_commit: List[Dict[str, float]] = list()
+        absolute_deltas: Dict[str, List[float]] = dict()
+        for commit_hash in commits_hashes:
+            previous_values_by_commit.append(dict(previous_values))
+            for name, value in values[commit_hash].items():
+                if name in previous_values:
+                    absolute_deltas.setdefault(name, []).append(abs(value - previous_values[name]))
+                previous_values[name] = value
+        noises: Dict[str, float] = {name: statistics.median(deltas) for name, deltas in absolute_deltas.items()}
+
+        timepoints: Dict[str, int] = dict(db.get_commits_timepoints())
+        commits: List[CommitDetails] = list()
+        for index, commit_hash in enumerate(commits_hashes):
+            message = fmt_repo.get_commit_message(commit_hash)
+            deltas = [CommitDelta(name, value, previous_values_by_commit[index].get(name), noises.get(name, 0.0))
+                      for name, value in sorted(values[commit_hash].items())]
+            commits.append(CommitDetails(commit_hash, message.split('\n', 1)[0], timepoints.get(commit_hash, 0), deltas))
+
+        for index, commit in enumerate(commits):
+            result_html = CommitsPage.commit_template_html.render(
+                pages=pages,
+                current_page_name=self.name,
+                commit=commit,
+                previous_commit=commits[index - 1] if index > 0 else None,
+                next_commit=commits[index + 1] if index + 1 < len(commits) else None,
+                get_commit_page_name=CommitsPage.get_commit_page_name)
+            result_html = html_minify(result_html)
+            with open(os.path.join(directory, CommitsPage.get_commit_page_name(commit.commit_hash)), 'w') as html_file:
+                html_file.write(result_html)
+
+        result_html = self.template_html.render(pages=pages,
+                                                current_page_name=self.name,
+                                                commits=list(reversed(commits)),
+                                                get_commit_page_name=CommitsPage.get_commit_page_name)
+        result_html = html_minify(result_html)
+        with open(os.path.join(directory, '{}.html'.format(self.slug)), 'w') as html_file:
+            html_file.write(result_html)
+
+
 class BenchmarkGroupPage(Page):
     def __init__(self, name: str, description: str, patterns: List[re.Pattern]):
         Page.__init__(self,
@@ -145,6 +379,18 @@ class BenchmarkGroupPage(Page):
                       icon='bi-bar-chart-fill')
 
 
+class AbRatioPage(Page):
+    def __init__(self, group_page: Page):
+        Page.__init__(self,
+                      template_html=Page.default_template_html,
+                      template_js=Page.default_template_js,
+                      name='{} • A/B'.format(group_page.name),
+                      description='{}, ratio to the baseline measured interleaved'.format(group_page.description),
+                      patterns=[re.compile('^' + re.escape(classes.ab_ratio_result_prefix) + pattern.pattern.lstrip('^'))
+                                for pattern in group_page.patterns],
+                      icon='bi-layout-split')
+
+
 class HomePage(Page):
     def __init__(self,
                  template_html: Template):
@@ -158,22 +404,23 @@ class HomePage(Page):
                       slug='index')
 
     def generate(self, filtered_results, pages, fmt_repo: FmtRepo, db: Database, directory: str):
-        meta_values: List[Tuple[str, str]] = db.get_meta_values()
-        bnchmrk_meta = None
-        bnchmrk_generator_meta = None
-        for meta_value in meta_values:
-            if meta_value[0] == 'fmt_bnchmrk commit':
-                bnchmrk_meta = meta_value
-            elif meta_value[0] == 'fmt_bnchmrk_gnrtr commit':
-                bnchmrk_generator_meta = meta_value
-        meta_values.remove(bnchmrk_meta)
-        meta_values.remove(bnchmrk_generator_meta)
+        meta_values: List[Tuple[str, str]] = list()
+        bnchmrk_metas: List[Tuple[str, str]] = list()
+        bnchmrk_generator_metas: List[Tuple[str, str]] = list()
+        # merged database can have these values labelled with their sources, or not have them at all
+        for meta_value in db.get_meta_values():
+            if re.match(r'^fmt_bnchmrk commit( \(.+\))?$', meta_value[0]):
+                bnchmrk_metas.append(meta_value)
+            elif re.match(r'^fmt_bnchmrk_gnrtr commit( \(.+\))?$', meta_value[0]):
+                bnchmrk_generator_metas.append(meta_value)
+            else:
+                meta_values.append(meta_value)
 
         result_html = self.template_html.render(pages=pages,
                                                 current_page_name=self.name,
                                                 meta_values=meta_values,
-                                                bnchmrk_meta=bnchmrk_meta,
-                                                bnchmrk_generator_meta=bnchmrk_generator_meta)
+                                                bnchmrk_metas=bnchmrk_metas,
+                                                bnchmrk_generator_metas=bnchmrk_generator_metas)
         result_html = html_minify(result_html)
         with open(os.path.join(directory, '{}.html'.format(self.slug)), 'w') as html_file:
             html_file.write(result_html)
@@ -189,6 +436,12 @@ class SiteGenerator:
         Page.default_template_html = env.get_template('page.html.jinja2')
         Page.default_template_js = env.get_template('script.js.jinja2')
 
+        SymbolSizesPage.default_template_html = env.get_template('symbols.html.jinja2')
+        SymbolSizesPage.default_template_js = env.get_template('symbols.js.jinja2')
+
+        CommitsPage.default_template_html = env.get_template('commits.html.jinja2')
+        CommitsPage.commit_template_html = env.get_template('commit.html.jinja2')
+
         self.home_page_template_html: Template = env.get_template('index.html.jinja2')
 
     def generate(self, db: Database, fmt_repo: FmtRepo, runners: List[classes.Runner], pages_dir: str):
@@ -197,10 +450,19 @@ class SiteGenerator:
 
         # home page
         pages.append(HomePage(self.home_page_template_html))
+        pages.append(CommitsPage())
 
         # stat pages
         pages.append(CompilationTimePage())
+        pages.append(CompilationPhasesPage())
+        pages.append(CompilerTimevarsPage())
+        pages.append(CompilationCpuTimePage())
+        pages.append(CompilationMemoryPage())
+        pages.append(CompilationContextSwitchesPage())
         pages.append(LibrarySizePage())
+        pages.append(LibrarySectionsPage('static'))
+        pages.append(LibrarySectionsPage('shared'))
+        pages.append(SymbolSizesPage(runners[0].ID))
 
         # format_to pages
         pages.append(BenchmarkGroupPage(name='format_to • trivial • integral',
@@ -260,6 +522,9 @@ class SiteGenerator:
         with open(os.path.join(self.templates_path, 'style.css'), 'r') as css_in:
             with open(os.path.join(pages_dir, 'style.css'), 'w+') as css_out:
                 css_out.write(css_minify(css_in.read()))
+        with open(os.path.join(self.templates_path, 'sortable.js'), 'r') as js_in:
+            with open(os.path.join(pages_dir, 'sortable.js'), 'w+') as js_out:
+                js_out.write(jsmin(js_in.read()))
 
         sorted_results_from_db = db.get_results_for(runners[0].ID)
         sorted_results = list()
@@ -271,6 +536,11 @@ class SiteGenerator:
             sorted_results.append(result)
         sorted_results.reverse()
 
+        # A/B pages are shown only if there are results of the A/B mode
+        if any(result[2].startswith(classes.ab_ratio_result_prefix) for result in sorted_results):
+            for group_page in [page for page in pages if isinstance(page, BenchmarkGroupPage)]:
+                pages.insert(pages.index(group_page) + 1, AbRatioPage(group_page))
+
         filtered_results_for_all_pages = list()
         for page in pages:
             filtered_results = page.filter_results(sorted_results)
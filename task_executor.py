@@ -0,0 +1,358 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Dict, List, Tuple, Optional
+
+from docker import DockerClient, errors
+from docker.models.images import Image
+
+from classes import Runner, Commit, Config, ab_ratio_result_prefix, ab_difference_result_prefix
+from database import symbol_size_result_name_format
+from fmt_bnchmrk_git_repository import FmtBnchmrkRepo
+from fmt_git_repository import FmtRepo
+from outputs_archive import OutputsArchive, extract_object
+from runner_containers import RunnerContainers
+
+
+def get_image_name_for_runner(runner_name: str) -> str:
+    return 'fmt_bnchmrk:{}'.format(runner_name)
+
+
+def get_stat_results(temp_dir_name: str) -> List[Tuple[str, float]]:
+    results = list()
+    compilation_time_total: float = 0.0
+    files = glob.glob(os.path.join(temp_dir_name, 'compilation_time_*.txt'))
+    for file_path in files:
+        with open(file_path, 'r') as result_txt:
+            lines = [line.rstrip() for line in result_txt]
+            for line in lines:
+                match = re.match(r"^real\t(\d+)m([\d.]+)s", line)
+                if match:
+                    minutes = float(match.group(1))
+                    seconds = float(match.group(2))
+                    compilation_time_total += seconds + minutes * 60
+    compilation_time = compilation_time_total / len(files)
+    results.append(('compilation_time', compilation_time))
+
+    with open(os.path.join(temp_dir_name, 'static_library_size.txt'), 'r') as result_txt:
+        library_size = int(result_txt.read())
+        results.append(('static_library_size', library_size))
+
+    with open(os.path.join(temp_dir_name, 'shared_library_size.txt'), 'r') as result_txt:
+        library_size = int(result_txt.read())
+        results.append(('shared_library_size', library_size))
+
+    return results
+
+
+library_sections: List[str] = ['.text', '.rodata', '.data', '.bss', '.eh_frame', '.gcc_except_table']
+
+
+def get_library_sizes_results(temp_dir_name: str) -> List[Tuple[str, float]]:
+    results = list()
+    for library in ['static', 'shared']:
+        # sections of template instantiations are named like ".text._ZN3fmt...", they are summed up by the prefix
+        sections_file_path = os.path.join(temp_dir_name, '{}_library_sections.txt'.format(library))
+        if os.path.exists(sections_file_path):
+            section_sizes = {section: 0 for section in library_sections}
+            with open(sections_file_path, 'r') as sections_txt:
+                for line in sections_txt:
+                    match = re.match(r"^(\.[^.\s]+)\S*\s+(\d+)\s+\d+", line)
+                    if match and match.group(1) in section_sizes:
+                        section_sizes[match.group(1)] += int(match.group(2))
+            for section, size in section_sizes.items():
+                results.append(('{}_library_section{}'.format(library, section.replace('.', '_')), size))
+
+        symbols_file_path = os.path.join(temp_dir_name, '{}_library_symbols.txt'.format(library))
+        if os.path.exists(symbols_file_path):
+            symbol_sizes = dict()
+            with open(symbols_file_path, 'r') as symbols_txt:
+                for line in symbols_txt:
+                    match = re.match(r"^(\d+) \S (.+)$", line.rstrip())
+                    if match:
+                        symbol = match.group(2)
+                        symbol_sizes[symbol] = symbol_sizes.get(symbol, 0) + int(match.group(1))
+            for symbol, size in symbol_sizes.items():
+                results.append((symbol_size_result_name_format.format(library=library, symbol=symbol), size))
+    return results
+
+
+def get_suites_results(temp_dir_name: str) -> List[Tuple[str, float]]:
+    files: List[str] = glob.glob(os.path.join(temp_dir_name, '*_results_*.json'))
+
+    class Result:
+        def __init__(self, name: str, amount: int, time: float):
+            self.name: str = name
+            self.amount: int = amount
+            self.time: float = time
+
+    results: List[Result] = list()
+    for file_path in files:
+        with open(file_path, 'r') as results_json:
+            parsed = json.load(results_json)
+            for benchmark in parsed['benchmarks']:
+                result_name = str(benchmark['name'])
+                result_time = float(benchmark['real_time'])
+                filtered_results: List[Result] = [result for result in results if result.name == result_name]
+                if len(filtered_results) == 0:
+                    results.append(Result(result_name, 1, result_time))
+                else:
+                    filtered_results[0].time += result_time
+                    filtered_results[0].amount += 1
+
+    return [(result.name, result.time / result.amount) for result in results]
+
+
+compilation_resources: List[Tuple[str, str]] = [
+    ('compilation_user_time', 'User time (seconds)'),
+    ('compilation_system_time', 'System time (seconds)'),
+    ('compilation_wall_time', 'Elapsed (wall clock) time (h:mm:ss or m:ss)'),
+    ('compilation_peak_rss', 'Maximum resident set size (kbytes)'),
+    ('compilation_voluntary_context_switches', 'Voluntary context switches'),
+    ('compilation_involuntary_context_switches', 'Involuntary context switches'),
+]
+
+
+def get_compilation_resources_results(temp_dir_name: str) -> List[Tuple[str, float]]:
+    files = glob.glob(os.path.join(temp_dir_name, 'compilation_resources_*.txt'))
+    if len(files) == 0:
+        return []
+
+    totals = {name: 0.0 for name, _ in compilation_resources}
+    for file_path in files:
+        values = dict()
+        with open(file_path, 'r') as result_txt:
+            for line in result_txt:
+                key, _, value = line.strip().rpartition(': ')
+                values[key] = value
+        for name, key in compilation_resources:
+            if name == 'compilation_wall_time':
+                seconds = 0.0
+                for part in values[key].split(':'):
+                    seconds = seconds * 60 + float(part)
+                totals[name] += seconds
+            elif name == 'compilation_peak_rss':
+                totals[name] += float(values[key]) * 1024
+            else:
+                totals[name] += float(values[key])
+    return [(name, total / len(files)) for name, total in totals.items()]
+
+
+def get_compilation_phase_name(phase: str) -> str:
+    return 'compilation_phase_{}'.format(re.sub(r'\W+', '_', phase.lower()).strip('_'))
+
+
+# top-level GCC timevars overlap phases, e.g. template instantiation is a part of parsing, so they are kept separately
+gcc_timevars: List[str] = [
+    'template instantiation',
+    'name lookup',
+    'overload resolution',
+    'constant expression evaluation',
+    'parser function body',
+    'parser struct body',
+]
+
+
+def get_compiler_timevar_name(timevar: str) -> str:
+    return 'compiler_timevar_{}'.format(re.sub(r'\W+', '_', timevar.lower()).strip('_'))
+
+
+def get_compilation_phases_results(temp_dir_name: str) -> List[Tuple[str, float]]:
+    results = list()
+
+    # GCC with -ftime-report, wall time of each phase and of selected timevars is used
+    report_file_path = os.path.join(temp_dir_name, 'compiler_time_report.txt')
+    if os.path.exists(report_file_path):
+        with open(report_file_path, 'r') as report_txt:
+            for line in report_txt:
+                match = re.match(r"^\s*(.+?)\s*:\s*[\d.]+\s*\(\s*\d+%\)\s*[\d.]+\s*\(\s*\d+%\)\s*([\d.]+)", line)
+                if not match:
+                    continue
+                if match.group(1).startswith('phase '):
+                    results.append((get_compilation_phase_name(match.group(1)[len('phase '):]),
+                                    float(match.group(2))))
+                elif match.group(1) in gcc_timevars:
+                    results.append((get_compiler_timevar_name(match.group(1)), float(match.group(2))))
+
+    # Clang with -ftime-trace, only non-overlapping totals are used, so phases can be stacked
+    trace_file_path = os.path.join(temp_dir_name, 'compiler_time_trace.json')
+    if os.path.exists(trace_file_path):
+        with open(trace_file_path, 'r') as trace_json:
+            parsed = json.load(trace_json)
+        totals = {str(event['name']): float(event['dur']) / 1000000
+                  for event in parsed['traceEvents'] if str(event.get('name', '')).startswith('Total ')}
+        instantiation_time: float = totals.get('Total PerformPendingInstantiations', 0.0)
+        results.append((get_compilation_phase_name('frontend'),
+                        totals.get('Total Frontend', 0.0) - instantiation_time))
+        results.append((get_compilation_phase_name('template instantiation'), instantiation_time))
+        results.append((get_compilation_phase_name('backend'), totals.get('Total Backend', 0.0)))
+
+    return results
+
+
+def get_runs_times(directory_name: str) -> Dict[Tuple[str, str], float]:
+    runs_times: Dict[Tuple[str, str], float] = dict()
+    for file_path in glob.glob(os.path.join(directory_name, '*_results_*.json')):
+        run = re.match(r"^.*_results_(\d+)\.json$", os.path.basename(file_path)).group(1)
+        with open(file_path, 'r') as results_json:
+            parsed = json.load(results_json)
+            for benchmark in parsed['benchmarks']:
+                runs_times[(str(benchmark['name']), run)] = float(benchmark['real_time'])
+    return runs_times
+
+
+def get_ab_results(temp_dir_name: str) -> List[Tuple[str, float]]:
+    baseline_dir_name = os.path.join(temp_dir_name, 'baseline')
+    if not os.path.isdir(baseline_dir_name):
+        return []
+
+    # candidate and baseline runs with the same index were executed one right after another, so they are paired
+    baseline_times = get_runs_times(baseline_dir_name)
+    ratios: Dict[str, List[float]] = dict()
+    differences: Dict[str, List[float]] = dict()
+    for (name, run), candidate_time in get_runs_times(temp_dir_name).items():
+        baseline_time = baseline_times.get((name, run))
+        if not baseline_time:
+            continue
+        ratios.setdefault(name, []).append(candidate_time / baseline_time)
+        differences.setdefault(name, []).append(candidate_time - baseline_time)
+
+    results = list()
+    for name in ratios:
+        results.append((ab_ratio_result_prefix + name, sum(ratios[name]) / len(ratios[name])))
+        results.append((ab_difference_result_prefix + name, sum(differences[name]) / len(differences[name])))
+    return results
+
+
+def parse_outputs(temp_dir_name: str) -> List[Tuple[str, float]]:
+    results = get_stat_results(temp_dir_name)
+    results.extend(get_compilation_resources_results(temp_dir_name))
+    results.extend(get_compilation_phases_results(temp_dir_name))
+    results.extend(get_library_sizes_results(temp_dir_name))
+    results.extend(get_suites_results(temp_dir_name))
+    results.extend(get_ab_results(temp_dir_name))
+    return results
+
+
+def parse_archived_outputs(object_path: Optional[str]) -> Optional[List[Tuple[str, float]]]:
+    if object_path is None:
+        return None  # faulty commit
+    with tempfile.TemporaryDirectory() as temp_dir_name:
+        extract_object(object_path, temp_dir_name)
+        return parse_outputs(temp_dir_name)
+
+
+def resolve_baseline(fmt_repo: FmtRepo, config: Config):
+    # a branch or a tag can move, so the baseline is pinned to a commit, which also goes to cache keys and meta
+    if config.ab_baseline is not None:
+        config.ab_baseline = fmt_repo.get_commit_hash(config.ab_baseline)
+
+
+def prepare_baseline(fmt_repo: FmtRepo, config: Config) -> Optional[tempfile.TemporaryDirectory]:
+    resolve_baseline(fmt_repo, config)
+    if config.ab_baseline is None:
+        return None
+    baseline_dir = tempfile.TemporaryDirectory()
+    fmt_repo.export_commit(config.ab_baseline, baseline_dir.name)
+    return baseline_dir
+
+
+def prepare_runner_containers(docker_client: DockerClient, fmt_repo: FmtRepo, fmt_bnchmrk_repo: FmtBnchmrkRepo,
+                              config: Config, baseline_dir_name: Optional[str]) -> Optional[RunnerContainers]:
+    if not config.persistent_containers:
+        return None
+    return RunnerContainers(docker_client, fmt_repo, fmt_bnchmrk_repo, baseline_dir_name,
+                            config.container_recycle_tasks)
+
+
+def execute_task(docker_client: DockerClient, fmt_repo: FmtRepo, fmt_bnchmrk_repo: FmtBnchmrkRepo, commit: Commit,
+                 runner: Runner, config: Config,
+                 baseline_dir_name: Optional[str] = None,
+                 runner_containers: Optional[RunnerContainers] = None,
+                 outputs_archive: Optional[OutputsArchive] = None) -> Optional[List[Tuple[str, float]]]:
+    fmt_repo.set_current_commit(commit.hash)
+
+    if runner_containers is not None:
+        temp_dir = runner_containers.get_output_dir()
+    else:
+        temp_dir = tempfile.TemporaryDirectory()
+    temp_dir_name = temp_dir.name
+    volumes = {
+        fmt_repo.get_directory(): {'bind': '/fmt', 'mode': 'ro'},
+        fmt_bnchmrk_repo.get_directory(): {'bind': '/benchmarks', 'mode': 'ro'},
+        temp_dir_name: {'bind': '/output', 'mode': 'rw'}
+    }
+    environment = {
+        "RUNNER_MAX_THREADS": config.max_threads,
+        "RUNNER_COMPILATION_RUNS": config.compilation_runs,
+        "RUNNER_COMPILATION_PAUSE": config.compilations_pause,
+        "RUNNER_BENCHMARK_RUNS": config.benchmark_runs,
+        "RUNNER_COMPILER_TIME_REPORT": int(config.compiler_time_report),
+        "RUNNER_AB_MODE": int(baseline_dir_name is not None),
+    }
+    if baseline_dir_name is not None:
+        volumes[baseline_dir_name] = {'bind': '/fmt_baseline', 'mode': 'ro'}
+
+    try:
+        if runner_containers is not None:
+            runner_containers.execute(runner, get_image_name_for_runner(runner.name), temp_dir_name, environment)
+        else:
+            docker_client.containers.run(get_image_name_for_runner(runner.name),
+                                         detach=False, volumes=volumes, environment=environment, remove=True)
+    except errors.ContainerError:
+        if config.skip_faulty_commits:
+            if outputs_archive is not None:
+                outputs_archive.store(commit, runner, None)
+            return None
+        else:
+            raise
+
+    if outputs_archive is not None:
+        outputs_archive.store(commit, runner, temp_dir_name)
+    return parse_outputs(temp_dir_name)
+
+
+runner_hash_label: str = 'fmt_bnchmrk.runner_hash'
+
+
+def get_runner_directory_hash(runner_directory: str) -> str:
+    hash_sha256 = hashlib.sha256()
+    for root, directories, files in os.walk(runner_directory):
+        directories.sort()
+        for file_name in sorted(files):
+            file_path = os.path.join(root, file_name)
+            hash_sha256.update(os.path.relpath(file_path, runner_directory).encode('utf-8'))
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(4096), b""):
+                    hash_sha256.update(chunk)
+    return hash_sha256.hexdigest()
+
+
+def get_built_image(docker_client: DockerClient, tag: str, directory_hash: str) -> Optional[Image]:
+    try:
+        image = docker_client.images.get(tag)
+    except errors.ImageNotFound:
+        return None
+    if image.labels.get(runner_hash_label) != directory_hash:
+        return None
+    return image
+
+
+def prepare_runners(docker_client: DockerClient) -> List[Runner]:
+    runner_directories = glob.glob('runners/*')
+    runners: List[Runner] = list()
+    for runner_directory in runner_directories:
+        tag_name = os.path.basename(runner_directory)
+        directory_hash: str = get_runner_directory_hash(runner_directory)
+        image = get_built_image(docker_client, get_image_name_for_runner(tag_name), directory_hash)
+        if image is None:
+            image = docker_client.images.build(path=runner_directory,
+                                               tag=get_image_name_for_runner(tag_name),
+                                               labels={runner_hash_label: directory_hash},
+                                               rm=True)[0]
+        description = image.labels['description']
+        runners.append(Runner(tag_name, description, image.id))
+    return runners
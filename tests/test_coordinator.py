@@ -0,0 +1,91 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from classes import Commit, Config, Runner
+from coordinator import Coordinator
+from database import Database, create_tables
+from results_cache import ResultsCache
+
+
+def create_config(database_dir: str, compilation_runs: int) -> Config:
+    return Config(2, compilation_runs, Config.default_compilations_pause, Config.default_benchmark_runs,
+                  Config.default_sleep_time, False, database_dir, database_dir, Config.default_skip_faulty_commits,
+                  None, Config.default_compiler_time_report, Config.default_ab_baseline,
+                  Config.default_persistent_containers, Config.default_container_recycle_tasks,
+                  Config.default_archive_outputs)
+
+
+class CoordinatorTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = create_config(self.temp_dir.name, 4)
+        self.worker_config = create_config(self.temp_dir.name, 8)
+
+        db_file_path = os.path.join(self.temp_dir.name, 'bnchmrk_test.db')
+        connection = sqlite3.connect(db_file_path)
+        create_tables(connection.cursor())
+        connection.commit()
+        connection.close()
+
+        self.runner = Runner('gcc-11', 'G++-11', 'coordinator_image')
+        self.commit = Commit('{:040x}'.format(1), 1600000000)
+        self.commit.ID = 1
+        self.db = Database.from_file(db_file_path)
+        with self.db:
+            self.db.synchronize_runners([self.runner])
+            self.db.update_commits([self.commit])
+            self.db.enqueue_tasks([self.commit], [self.runner])
+
+        self.results_cache = ResultsCache(self.config, 'bnchmrk')
+        self.coordinator = Coordinator(self.db, self.results_cache, [self.runner], 'bnchmrk', self.config, 60.0)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def lease(self, config: Config):
+        return self.coordinator.lease({'worker': 'worker', 'runners': [self.runner.name], 'bnchmrk_commit': 'bnchmrk',
+                                       'ab_baseline': config.ab_baseline,
+                                       'measurement_config': json.loads(config.as_measurement_bytes())})
+
+    def upload(self, config: Config, docker_ID: str):
+        return self.coordinator.upload({'worker': 'worker', 'commit_ID': self.commit.ID,
+                                        'runner_name': self.runner.name, 'runner_docker_ID': docker_ID,
+                                        'measurement_config': json.loads(config.as_measurement_bytes()),
+                                        'results': [['compilation_time', 1.5]]})
+
+    def is_cached(self, config: Config, docker_ID: str) -> bool:
+        results_cache = ResultsCache(config, 'bnchmrk')
+        connection = sqlite3.connect(results_cache.file_path)
+        is_cached, _ = ResultsCache._load_(connection, results_cache.get_key(
+            self.commit, Runner(self.runner.name, self.runner.description, docker_ID)))
+        connection.close()
+        return is_cached
+
+    def test_lease_with_other_measurement_options_is_rejected(self):
+        status, response = self.lease(self.worker_config)
+        self.assertEqual(status, 409)
+        self.assertIn('measurement options', response['error'])
+
+    def test_upload_with_other_measurement_options_is_not_cached(self):
+        status, _ = self.lease(self.config)
+        self.assertEqual(status, 200)
+        status, _ = self.upload(self.worker_config, 'worker_image')
+        self.assertEqual(status, 409)
+        self.assertFalse(self.is_cached(self.config, 'worker_image'))
+        self.assertFalse(self.is_cached(self.config, 'coordinator_image'))
+        self.assertFalse(self.is_cached(self.worker_config, 'worker_image'))
+
+    def test_upload_is_cached_under_worker_image(self):
+        status, _ = self.lease(self.config)
+        self.assertEqual(status, 200)
+        status, _ = self.upload(self.config, 'worker_image')
+        self.assertEqual(status, 200)
+        self.assertTrue(self.is_cached(self.config, 'worker_image'))
+        self.assertFalse(self.is_cached(self.config, 'coordinator_image'))
+
+
+if __name__ == '__main__':
+    unittest.main()
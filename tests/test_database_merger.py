@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from database import Database, create_tables
+from database_merger import MergeError, merge_databases
+from site_generator import HomePage, SiteGenerator
+
+repository_dir: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_database(file_path: str, meta: dict, results: list):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    connection = sqlite3.connect(file_path)
+    cursor = connection.cursor()
+    create_tables(cursor)
+    cursor.executemany('INSERT INTO meta (key, value) VALUES (?, ?);', list(meta.items()))
+    cursor.execute('INSERT INTO runners (name, description) VALUES (?, ?);', ('gcc-11', 'G++-11'))
+    for commit_ID, commit_hash, name, time in results:
+        cursor.execute('INSERT OR IGNORE INTO commits (ID, hash, timepoint) VALUES (?, ?, ?);',
+                       (commit_ID, commit_hash, 1600000000 + commit_ID))
+        cursor.execute('INSERT INTO results (commit_ID, runner_ID, name, time) VALUES (?, 1, ?, ?);',
+                       (commit_ID, name, time))
+    connection.commit()
+    connection.close()
+
+
+class MergeDatabasesTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.inputs = [os.path.join(self.temp_dir.name, host, 'bnchmrk_abc.db') for host in ('host1', 'host2')]
+        self.output = os.path.join(self.temp_dir.name, 'bnchmrk_merged.db')
+        for index, input_file_path in enumerate(self.inputs):
+            create_database(input_file_path,
+                            {'platform': 'platform {}'.format(index),
+                             'fmt_bnchmrk commit': 'bnchmrk',
+                             'fmt_bnchmrk_gnrtr commit': 'gnrtr {}'.format(index)},
+                            [(index, '{:040x}'.format(index), 'compilation_time', 1.0 + index)])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def get_meta(self) -> dict:
+        connection = sqlite3.connect(self.output)
+        meta = dict(connection.execute('SELECT key, value FROM meta;'))
+        connection.close()
+        return meta
+
+    def test_differing_meta_is_labelled_for_every_source(self):
+        merge_databases(self.output, self.inputs)
+        merge_databases(self.output, self.inputs)
+        meta = self.get_meta()
+        self.assertEqual(meta['fmt_bnchmrk commit'], 'bnchmrk')
+        self.assertNotIn('platform', meta)
+        for index, input_file_path in enumerate(self.inputs):
+            self.assertEqual(meta['platform ({})'.format(input_file_path)], 'platform {}'.format(index))
+        connection = sqlite3.connect(self.output)
+        self.assertEqual(len(list(connection.execute('SELECT * FROM meta;'))), len(meta))
+        self.assertEqual(len(list(connection.execute('SELECT * FROM results;'))), 2)
+        connection.close()
+
+    def test_differing_bnchmrk_commit_is_rejected(self):
+        create_database(os.path.join(self.temp_dir.name, 'host3', 'bnchmrk_abc.db'),
+                        {'fmt_bnchmrk commit': 'other'}, [])
+        with self.assertRaises(MergeError):
+            merge_databases(self.output, self.inputs + [os.path.join(self.temp_dir.name, 'host3', 'bnchmrk_abc.db')])
+
+    def test_home_page_is_rendered_from_merged_database(self):
+        merge_databases(self.output, self.inputs)
+        current_dir = os.getcwd()
+        os.chdir(repository_dir)  # templates are looked up relative to the repository
+        try:
+            site_generator = SiteGenerator()
+        finally:
+            os.chdir(current_dir)
+        page = HomePage(site_generator.home_page_template_html)
+        db = Database.from_file(self.output)
+        with db:
+            self.assertEqual([runner.name for runner in db.get_runners()], ['gcc-11'])
+            page.generate([], [page], None, db, self.temp_dir.name)
+        with open(os.path.join(self.temp_dir.name, 'index.html'), 'r') as html_file:
+            html = html_file.read()
+        for index in range(len(self.inputs)):
+            self.assertIn('gnrtr {}'.format(index), html)
+            self.assertIn('platform {}'.format(index), html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,13 @@
 from datetime import datetime
+from typing import Tuple, Type
 
 
 class StepPrinter:
-    def __init__(self, message: str, is_fail_allowed: bool = False):
+    def __init__(self, message: str, is_fail_allowed: bool = False,
+                 allowed_exceptions: Tuple[Type[BaseException], ...] = ()):
         self.message: str = message
         self.fail_allowed: bool = is_fail_allowed
+        self.allowed_exceptions: Tuple[Type[BaseException], ...] = allowed_exceptions
 
     def __enter__(self):
         print(self.message + '...', end='', flush=True)
@@ -15,7 +18,7 @@ class StepPrinter:
         if exception_type is None:
             print(' done in {:.2f}s.'.format(time_delta.total_seconds()))
         else:
-            if self.fail_allowed:
+            if self.fail_allowed or issubclass(exception_type, self.allowed_exceptions):
                 print(' failed in {:.2f}s, but who cares! With message: {}.'.format(time_delta.total_seconds(),
                                                                                     exception_value))
             else:
@@ -0,0 +1,162 @@
+import json
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from docker import from_env
+
+from classes import Runner, Commit, Config
+from fmt_bnchmrk_git_repository import FmtBnchmrkRepo
+from fmt_git_repository import FmtRepo
+from outputs_archive import OutputsArchive
+from task_executor import execute_task, prepare_baseline, prepare_runner_containers, prepare_runners
+from tools import StepPrinter
+
+
+class TaskRejectedError(Exception):
+    pass
+
+
+def get_default_worker_name() -> str:
+    return '{}-{}'.format(socket.gethostname(), os.getpid())
+
+
+class CoordinatorClient:
+    # a hung coordinator shouldn't block a worker forever, timed out requests are retried as unreachable ones
+    timeout: float = 60.0
+
+    def __init__(self, url: str, worker_name: str):
+        self.url: str = url.rstrip('/')
+        self.worker_name: str = worker_name
+
+    def _post_(self, path: str, payload: Dict) -> Optional[Dict]:
+        payload['worker'] = self.worker_name
+        request = urllib.request.Request(self.url + path,
+                                         data=json.dumps(payload).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'},
+                                         method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=CoordinatorClient.timeout) as response:
+                if response.status == 204:
+                    return None
+                return json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            if error.code == 409:
+                raise TaskRejectedError(json.loads(error.read())['error'])
+            raise
+
+    def lease(self, runners: List[Runner], bnchmrk_commit_hash: str, config: Config) -> Optional[Dict]:
+        return self._post_('/lease', {
+            'runners': [runner.name for runner in runners],
+            'bnchmrk_commit': bnchmrk_commit_hash,
+            'ab_baseline': config.ab_baseline,
+            'measurement_config': json.loads(config.as_measurement_bytes()),
+        })
+
+    def heartbeat(self, task: Dict):
+        self._post_('/heartbeat', {'commit_ID': task['commit_ID'], 'runner_name': task['runner_name']})
+
+    def upload(self, task: Dict, runner: Runner, config: Config, results: Optional[List[Tuple[str, float]]]):
+        self._post_('/results', {'commit_ID': task['commit_ID'], 'runner_name': task['runner_name'],
+                                 'runner_docker_ID': runner.docker_ID,
+                                 'measurement_config': json.loads(config.as_measurement_bytes()),
+                                 'results': results})
+
+
+class Heartbeat:
+    def __init__(self, client: CoordinatorClient, task: Dict):
+        self.client: CoordinatorClient = client
+        self.task: Dict = task
+        self.interval: float = task['lease_time'] / 3
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run_, daemon=True)
+
+    def _run_(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.client.heartbeat(self.task)
+            except TaskRejectedError:
+                return  # results will be rejected by the coordinator anyway
+            except (urllib.error.URLError, OSError):
+                continue  # coordinator may be restarting, the lease is still valid for a while
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def upload_results(client: CoordinatorClient, task: Dict, runner: Runner, config: Config,
+                   results: Optional[List[Tuple[str, float]]]):
+    # re-running a task takes much longer than waiting for the coordinator, so the upload is retried until it's
+    # either accepted or rejected
+    is_upload_finished: bool = False
+    while not is_upload_finished:
+        with StepPrinter('Uploading results to coordinator',
+                         allowed_exceptions=(TaskRejectedError, urllib.error.URLError, OSError)):
+            try:
+                client.upload(task, runner, config, results)
+            except TaskRejectedError:
+                is_upload_finished = True  # the task is leased to another worker, so results are not needed anymore
+                raise
+            is_upload_finished = True
+        if not is_upload_finished:
+            with StepPrinter('Sleeping before uploading results again'):
+                time.sleep(config.sleep_time)
+
+
+def run_worker(config: Config, coordinator_url: str, worker_name: str):
+    with StepPrinter('Preparing fmt_bnchmrk repository'):
+        fmt_bnchmrk_repo = FmtBnchmrkRepo(config.repositories_dir)
+    with StepPrinter('Preparing {fmt} repository'):
+        fmt_repo = FmtRepo(config.repositories_dir)
+    with StepPrinter('Initializing Docker client'):
+        docker_client = from_env()
+    with StepPrinter('Preparing runners'):
+        runners: List[Runner] = prepare_runners(docker_client)
+    with StepPrinter('Preparing A/B baseline'):
+        baseline_dir = prepare_baseline(fmt_repo, config)
+        baseline_dir_name: Optional[str] = baseline_dir.name if baseline_dir is not None else None
+    with StepPrinter('Preparing runner containers'):
+        runner_containers = prepare_runner_containers(docker_client, fmt_repo, fmt_bnchmrk_repo, config,
+                                                      baseline_dir_name)
+
+    bnchmrk_commit_hash: str = fmt_bnchmrk_repo.get_commit_hash()
+    with StepPrinter('Preparing outputs archive'):
+        # outputs are archived on the host that executed the task, not on the coordinator
+        outputs_archive = OutputsArchive(config, bnchmrk_commit_hash) if config.archive_outputs else None
+
+    client = CoordinatorClient(coordinator_url, worker_name)
+    try:
+        while True:
+            task: Optional[Dict] = None
+            # coordinator may be restarting or unreachable for a while, so the lease is requested again later
+            with StepPrinter('Requesting task from coordinator "{}"'.format(coordinator_url),
+                             allowed_exceptions=(urllib.error.URLError, OSError)):
+                task = client.lease(runners, bnchmrk_commit_hash, config)
+            if task is None:
+                with StepPrinter('Sleeping'):
+                    time.sleep(config.sleep_time)
+                continue
+
+            commit = Commit(task['commit_hash'], task['commit_timepoint'])
+            commit.ID = task['commit_ID']
+            runner = [runner for runner in runners if runner.name == task['runner_name']][0]
+            with StepPrinter('Updating {fmt} repository'):
+                fmt_repo.update()
+            # heartbeats are sent while results are being uploaded too, so the lease isn't lost during retries
+            with Heartbeat(client, task):
+                with StepPrinter('Executing task on commit "{}" with runner "{}"'.format(commit.hash, runner.name)):
+                    results = execute_task(docker_client, fmt_repo, fmt_bnchmrk_repo, commit, runner, config,
+                                           baseline_dir_name, runner_containers, outputs_archive)
+                upload_results(client, task, runner, config, results)
+    finally:
+        if runner_containers is not None:
+            runner_containers.close()